@@ -0,0 +1,312 @@
+"""ML-ENSEMBLE
+
+:author: Sebastian Flennerhag
+:copyright: 2017
+:licence: MIT
+
+Benchmark suite with regression tracking.
+
+Times ``fit``, ``predict`` and ``transform`` of each ensemble class on each
+backend across data sizes, and records throughput and peak memory of the
+process tree to a JSON results file. If a baseline results file is given,
+cases that are slower or use more memory than the baseline by more than a
+tolerance are reported, and the script exits with status 1.
+
+The ensembles use the transparent estimators of :mod:`mlens.utils.dummy`,
+so the suite measures the overhead of mlens rather than of the estimators.
+Between them, the ensembles cover every indexer: the
+:class:`SequentialEnsemble` stacks a fold, a blend and a subset layer.
+
+Examples
+--------
+
+Store a baseline, then compare a later version against it
+
+>>> python bench.py --sizes 10000 100000 --output baseline.json
+>>> python bench.py --sizes 10000 100000 --output new.json \\
+...     --baseline baseline.json
+ML-ENSEMBLE
+
+Benchmarking 24 cases (mlens 0.1.0, 4 CPUs)
+SuperLearner  threading        n=10000   fit        0.052s   192.3k/s   0.9MB
+...
+
+Regressions against baseline.json (tolerance 10%):
+Subsemble  multiprocessing  n=100000  fit  time  1.032s -> 1.311s  (+27%)
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from functools import partial
+from time import sleep, time
+
+import numpy as np
+
+import mlens
+from mlens.ensemble import (SuperLearner, BlendEnsemble, Subsemble,
+                            SequentialEnsemble)
+from mlens.utils.dummy import OLS, Scale
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from time import time as clock
+
+try:
+    from mlens.utils import CMLog
+    CMLog()
+except ImportError:
+    # Requires psutil
+    CMLog = None
+
+
+ENSEMBLES = ['SuperLearner', 'BlendEnsemble', 'Subsemble',
+             'SequentialEnsemble']
+BACKENDS = ['threading', 'multiprocessing']
+JOBS = ['fit', 'predict', 'transform']
+SIZES = [1000, 10000, 100000]
+
+COLS = 10
+FOLDS = 3
+SEED = 2017
+
+# Interval between memory samples, in seconds
+IVAL = 0.01
+
+# Memory increases below this many bytes are not reported as regressions
+MEMORY_NOISE = 2 ** 22
+
+PREPROCESSING = {'sc': [('sc', Scale())], 'no': []}
+ESTIMATORS = {'sc': [('ols-%i' % i, OLS(offset=i)) for i in range(2)],
+              'no': [('ols-%i' % i, OLS(offset=i)) for i in range(2)]}
+
+
+def build_ensemble(name, backend, n_jobs):
+    """Build an ensemble of class ``name``."""
+    kwargs = dict(backend=backend, n_jobs=n_jobs)
+
+    if name == 'SequentialEnsemble':
+        ens = SequentialEnsemble(**kwargs)
+        ens.add('stack', ESTIMATORS, PREPROCESSING, n_splits=FOLDS)
+        ens.add('blend', ESTIMATORS, PREPROCESSING)
+        ens.add('subset', ESTIMATORS, PREPROCESSING, n_partitions=2,
+                n_splits=FOLDS)
+        ens.add_meta(OLS())
+        return ens
+
+    if name == 'SuperLearner':
+        ens = SuperLearner(folds=FOLDS, **kwargs)
+    elif name == 'BlendEnsemble':
+        ens = BlendEnsemble(**kwargs)
+    elif name == 'Subsemble':
+        ens = Subsemble(partitions=2, folds=FOLDS, **kwargs)
+    else:
+        raise ValueError("Unknown ensemble %r. Choose from %r."
+                         % (name, ENSEMBLES))
+
+    ens.add(ESTIMATORS, PREPROCESSING)
+    ens.add_meta(OLS())
+    return ens
+
+
+def get_data(n):
+    """Regression data with ``n`` samples."""
+    r = np.random.RandomState(SEED)
+    X = r.rand(n, COLS)
+    y = X.dot(r.rand(COLS)) + 0.1 * r.randn(n)
+    return X, y
+
+
+def measure(func, repeat):
+    """Time a call and measure the peak memory of the process tree.
+
+    Returns the best and median time over ``repeat`` calls, and the largest
+    increase in resident memory over the first call, in bytes. Memory is
+    ``None`` if psutil is not installed.
+    """
+    peak = None
+    if CMLog is not None:
+        cm = CMLog()
+        cm.monitor(ival=IVAL)
+        # Let the monitor take a first sample as reference
+        sleep(2 * IVAL)
+
+    times = list()
+    for _ in range(repeat):
+        t0 = clock()
+        func()
+        times.append(clock() - t0)
+
+    if CMLog is not None:
+        sleep(2 * IVAL)
+        cm.collect()
+        peak = int(cm.rss.max() - cm.rss[0])
+
+    return min(times), float(np.median(times)), peak
+
+
+def run_case(name, backend, n, repeat, n_jobs):
+    """Benchmark all jobs of an ensemble on one backend and data size."""
+    X, y = get_data(n)
+    ens = build_ensemble(name, backend, n_jobs)
+
+    results = list()
+    for job in JOBS:
+        if job == 'fit':
+            func = partial(ens.fit, X, y)
+        elif job == 'predict':
+            func = partial(ens.predict, X)
+        else:
+            func = partial(ens.layers.transform, X)
+
+        best, median, peak = measure(func, repeat)
+        results.append({'ensemble': name,
+                        'backend': backend,
+                        'n': n,
+                        'job': job,
+                        'time': best,
+                        'median': median,
+                        'throughput': n / best,
+                        'memory': peak})
+    return results
+
+
+def key(result):
+    """Identifier of the case of a result."""
+    return '%s/%s/%i/%s' % (result['ensemble'], result['backend'],
+                            result['n'], result['job'])
+
+
+def metadata():
+    """Describe the software and machine the suite runs on."""
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {'mlens': mlens.__version__,
+            'commit': commit,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count() if hasattr(os, 'cpu_count') else None,
+            'time': time()}
+
+
+def compare(results, baseline, tolerance):
+    """List results that regressed against a baseline.
+
+    A result regresses if its time or memory exceeds that of the same case
+    in the baseline by more than ``tolerance``, relative to the baseline.
+    Memory increases below ``MEMORY_NOISE`` bytes are ignored.
+    """
+    old = dict((key(r), r) for r in baseline['results'])
+
+    regressions = list()
+    for r in results:
+        b = old.get(key(r))
+        if b is None:
+            continue
+
+        if r['time'] > b['time'] * (1 + tolerance):
+            regressions.append((r, 'time', b['time'], r['time']))
+
+        if (r['memory'] is not None and b['memory'] is not None and
+                r['memory'] - b['memory'] > max(b['memory'] * tolerance,
+                                                MEMORY_NOISE)):
+            regressions.append((r, 'memory', b['memory'], r['memory']))
+    return regressions
+
+
+def fmt_bytes(n):
+    """Format bytes as megabytes."""
+    return '-' if n is None else '%.1fMB' % (n / 2 ** 20)
+
+
+def fmt_result(r):
+    """Format a result as a line of the report."""
+    return '%-18s  %-15s  n=%-8i  %-9s  %8.3fs  %8.1fk/s  %8s' % (
+        r['ensemble'], r['backend'], r['n'], r['job'], r['time'],
+        r['throughput'] / 1000, fmt_bytes(r['memory']))
+
+
+def fmt_regression(r, metric, old, new):
+    """Format a regression as a line of the report."""
+    f = fmt_bytes if metric == 'memory' else (lambda t: '%.3fs' % t)
+    change = (new - old) / old * 100 if old else float('inf')
+    return '%s  %s  n=%i  %s  %s  %s -> %s  (%+.0f%%)' % (
+        r['ensemble'], r['backend'], r['n'], r['job'], metric, f(old),
+        f(new), change)
+
+
+def main(argv=None):
+    """Run the suite from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark suite with regression tracking.')
+    parser.add_argument('--ensembles', nargs='+', default=ENSEMBLES,
+                        choices=ENSEMBLES)
+    parser.add_argument('--backends', nargs='+', default=BACKENDS,
+                        choices=BACKENDS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='calls per job; the best time is recorded')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--output', default='benchmark.json',
+                        help='file to write results to')
+    parser.add_argument('--baseline', default=None,
+                        help='results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative slowdown or memory increase '
+                             'reported as a regression')
+    args = parser.parse_args(argv)
+
+    meta = metadata()
+    cases = [(e, b, n) for e in args.ensembles for b in args.backends
+             for n in args.sizes]
+
+    print('ML-ENSEMBLE\n')
+    print('Benchmarking %i cases (mlens %s, %s CPUs)'
+          % (len(cases) * len(JOBS), meta['mlens'], meta['cpus']))
+    if CMLog is None:
+        print('psutil not installed: memory is not recorded.')
+
+    results = list()
+    for name, backend, n in cases:
+        for r in run_case(name, backend, n, args.repeat, args.n_jobs):
+            print(fmt_result(r))
+            sys.stdout.flush()
+            results.append(r)
+
+    with open(args.output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=1)
+    print('\nResults written to %s' % args.output)
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print('No regressions against %s (tolerance %.0f%%).'
+              % (args.baseline, args.tolerance * 100))
+        return 0
+
+    print('\nRegressions against %s (tolerance %.0f%%):'
+          % (args.baseline, args.tolerance * 100))
+    for regression in regressions:
+        print(fmt_regression(*regression))
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
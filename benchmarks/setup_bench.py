@@ -0,0 +1,155 @@
+"""ML-ENSEMBLE
+
+:author: Sebastian Flennerhag
+:copyright: 2017
+:licence: MIT
+
+Micro-benchmarks of the setup paths run on every fit.
+
+Times, for each layer class and a grid of ``n_partitions x n_splits x
+n_estimators``:
+
+    - ``index``: generating all train and test indices of the indexer.
+    - ``expand``: ``_expand_instance_list``, which copies estimators to every
+      fold.
+    - ``col_idx``: ``_get_col_id`` of the engine, which maps estimators to
+      columns from the engine's task records.
+    - ``engine``: building the estimation engine, i.e. all of the above.
+    - ``fit_tasks``: building the list of fit tasks of the engine.
+
+Examples
+--------
+>>> python setup_bench.py --grid 2,2,2 50,10,20
+ML-ENSEMBLE
+
+Setup benchmarks (best of 3, milliseconds)
+cls      partitions  splits  estimators  entries    tasks     index  ...
+stack             1       2           2        3        6     0.010  ...
+...
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import json
+import sys
+from timeit import repeat
+
+import numpy as np
+
+from mlens.base import BlendIndex, FoldIndex, SubsetIndex
+from mlens.ensemble.base import Layer
+from mlens.parallel import Blender, Stacker, SubStacker
+from mlens.parallel import blend, stack, subset
+from mlens.utils.dummy import OLS
+
+N_SAMPLES = 10000
+COLS = 2
+
+GRID = [(2, 2, 2), (10, 5, 10), (50, 10, 20)]
+
+CLASSES = ['stack', 'subset', 'blend']
+
+ENGINES = {'stack': (Stacker, stack),
+           'subset': (SubStacker, subset),
+           'blend': (Blender, blend)}
+
+
+def build_layer(cls, n_partitions, n_splits, n_estimators, X):
+    """Build a layer with a fitted indexer."""
+    if cls == 'stack':
+        indexer = FoldIndex(n_splits)
+    elif cls == 'subset':
+        indexer = SubsetIndex(n_partitions, n_splits)
+    else:
+        indexer = BlendIndex()
+    indexer.fit(X)
+
+    estimators = [('ols-%i' % i, OLS(offset=i)) for i in range(n_estimators)]
+    return Layer(estimators, cls, indexer=indexer, partitions=n_partitions,
+                 name='layer-1')
+
+
+def run_case(cls, n_partitions, n_splits, n_estimators, n_repeat):
+    """Time the setup paths of one layer."""
+    X = np.zeros((N_SAMPLES, COLS))
+    y = np.zeros(N_SAMPLES)
+
+    layer = build_layer(cls, n_partitions, n_splits, n_estimators, X)
+    engine_cls, module = ENGINES[cls]
+    engine = engine_cls(layer)
+    P = np.zeros((layer.indexer.n_test_samples, len(engine.c)))
+
+    calls = [('index', lambda: list(layer.indexer.generate())),
+             ('expand', lambda: module._expand_instance_list(
+                 layer.estimators, layer.indexer)),
+             ('col_idx', engine._get_col_id),
+             ('engine', lambda: engine_cls(layer)),
+             ('fit_tasks', lambda: engine._fit_tasks(X, y, P, None))]
+
+    result = {'cls': cls,
+              'partitions': n_partitions if cls == 'subset' else 1,
+              'splits': n_splits if cls != 'blend' else 1,
+              'estimators': n_estimators,
+              'entries': len(engine.e),
+              'tasks': len(engine._fit_tasks(X, y, P, None))}
+    for name, func in calls:
+        result[name] = min(repeat(func, number=1, repeat=n_repeat)) * 1000
+    return result
+
+
+COLUMNS = ['cls', 'partitions', 'splits', 'estimators', 'entries', 'tasks',
+           'index', 'expand', 'col_idx', 'engine', 'fit_tasks']
+
+
+def fmt_result(r):
+    """Format a result as a line of the report."""
+    return '%-7s  %10i  %6i  %10i  %7i  %7i  %8.3f  %8.3f  %8.3f  %8.3f  ' \
+           '%9.3f' % tuple([r[c] for c in COLUMNS])
+
+
+def main(argv=None):
+    """Run the micro-benchmarks from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmarks of the setup paths run on every fit.')
+    parser.add_argument('--cls', nargs='+', default=CLASSES, choices=CLASSES)
+    parser.add_argument('--grid', nargs='+', default=None,
+                        help='partitions,splits,estimators triplets')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None,
+                        help='file to write results to, as JSON')
+    args = parser.parse_args(argv)
+
+    grid = GRID
+    if args.grid is not None:
+        grid = [tuple(int(v) for v in g.split(',')) for g in args.grid]
+
+    print('ML-ENSEMBLE\n')
+    print('Setup benchmarks (best of %i, milliseconds)' % args.repeat)
+    print('cls      partitions  splits  estimators  entries    tasks     '
+          'index    expand   col_idx    engine  fit_tasks')
+
+    results = list()
+    for cls in args.cls:
+        seen = set()
+        for p, s, e in grid:
+            # Blend layers have no folds or partitions, and stack layers
+            # no partitions
+            key = (p if cls == 'subset' else 1, s if cls != 'blend' else 1, e)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            r = run_case(cls, p, s, e, args.repeat)
+            print(fmt_result(r))
+            sys.stdout.flush()
+            results.append(r)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
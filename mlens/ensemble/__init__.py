@@ -9,5 +9,7 @@ from .super_learner import SuperLearner
 from .blend import BlendEnsemble
 from .subsemble import Subsemble
 from .sequential import SequentialEnsemble
+from .frozen import FrozenEnsemble
 
-__all__ = ['SuperLearner', 'BlendEnsemble', 'Subsemble', 'SequentialEnsemble']
+__all__ = ['SuperLearner', 'BlendEnsemble', 'Subsemble', 'SequentialEnsemble',
+           'FrozenEnsemble']
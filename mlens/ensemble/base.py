@@ -10,17 +10,25 @@ Base classes for ensemble layer management.
 from __future__ import division, print_function
 
 import gc
+import os
+import shutil
+import tempfile
 import warnings
 from abc import ABCMeta, abstractmethod
 from collections import OrderedDict
 
+import numpy as np
 
+from .frozen import FrozenEnsemble
 from ..base import INDEXERS
 from ..parallel import ParallelProcessing
+from ..parallel.profile import Profile
+from ..externals.joblib import Parallel
+from ..externals.joblib.parallel import JOBLIB_SPAWNED_PROCESS
 from ..externals.sklearn.base import BaseEstimator
 from ..externals.sklearn.validation import check_random_state
 from ..utils import assert_correct_format, check_ensemble_build, \
-    check_inputs, check_instances, print_time, safe_print
+    check_inputs, check_instances, check_is_fitted, print_time, safe_print
 try:
     # Try get performance counter
     from time import perf_counter as time
@@ -29,6 +37,20 @@ except ImportError:
     from time import time
 
 
+def _allocate(out, shape, dtype):
+    """Get an array to write predictions to.
+
+    Arrays are returned as is, a path creates a ``.npy`` memmap and ``None``
+    allocates an array in memory.
+    """
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode='w+', dtype=dtype,
+                                         shape=shape)
+    return out
+
+
 class LayerContainer(BaseEstimator):
 
     r"""Container class for layers.
@@ -62,6 +84,34 @@ class LayerContainer(BaseEstimator):
         If ``verbose >= 50`` prints to ``sys.stdout``, else ``sys.stderr``.
         For verbosity in the layers themselves, use ``fit_params``.
 
+    scheduler : bool (default = False)
+        whether to process all layers as one graph of tasks. A task is then
+        dispatched as soon as the predictions it depends on are written,
+        rather than when all tasks in the previous layer have completed.
+
+    in_memory : bool or int (default = 1000)
+        whether to predict without caching arrays on disk. Estimators are then
+        run sequentially, or on threads if ``backend='threading'``. If an int,
+        predictions are made in memory when ``backend='threading'`` and ``X``
+        has at most ``in_memory`` rows.
+
+    dtype : numpy dtype (default = numpy.float64)
+        data type of the prediction matrices passed between layers and of the
+        final predictions.
+
+    warm_start : bool (default = False)
+        whether to keep estimators from the previous call to ``fit``.
+        Estimators fitted on the same data, with unchanged parameters,
+        preprocessing and folds, are not refitted, and unchanged layers are
+        skipped. Layers are then fitted one at a time, even if
+        ``scheduler=True``.
+
+    memory : str or None (default = None)
+        directory to cache fitted transformers and estimators in. Entries are
+        keyed on a hash of the training data, the folds and the parameters of
+        each estimator and its preprocessing, so refitting the ensemble, or
+        another ensemble, only fits estimators not in the cache. Layers are
+        then fitted one at a time, even if ``scheduler=True``.
     """
 
     def __init__(self,
@@ -69,17 +119,93 @@ class LayerContainer(BaseEstimator):
                  n_jobs=-1,
                  backend='multiprocessing',
                  raise_on_exception=False,
-                 verbose=False):
+                 verbose=False,
+                 scheduler=False,
+                 in_memory=1000,
+                 dtype=np.float64,
+                 warm_start=False,
+                 memory=None):
 
         # True params
         self.n_jobs = n_jobs
         self.backend = backend
         self.raise_on_exception = raise_on_exception
         self.verbose = verbose
+        self.scheduler = scheduler
+        self.in_memory = in_memory
+        self.dtype = dtype
+        self.warm_start = warm_start
+        self.memory = memory
 
         # Set up layer
         self._init_layers(layers)
 
+    def open(self):
+        """Start a pool of workers to use in all subsequent calls.
+
+        By default, each call to ``fit``, ``predict`` and ``transform``
+        starts and terminates its own pool of workers and dumps its inputs
+        to a new cache. Once opened, the container instead reuses one pool
+        until :meth:`close` is called, and inputs are dumped once and kept
+        mapped, so that a call on the same ``X`` or ``y`` as the previous
+        call reuses its memmap. In a worker process spawned by joblib, where
+        process pools cannot be nested, the pool runs on threads.
+
+        Returns
+        -------
+        self : instance
+            container with an open pool of workers.
+        """
+        if getattr(self, '_parallel', None) is not None:
+            return self
+
+        backend = self.backend
+        if backend == 'multiprocessing' and \
+                os.environ.get(JOBLIB_SPAWNED_PROCESS):
+            # Joblib does not let processes it spawned start process pools
+            backend = 'threading'
+
+        self._parallel = Parallel(n_jobs=self.n_jobs,
+                                  max_nbytes=None,
+                                  mmap_mode='r+',
+                                  verbose=self.verbose,
+                                  backend=backend)
+        self._parallel.__enter__()
+
+        # Inputs mapped by ParallelProcessing, by name
+        self._inputs = dict()
+        self._input_dir = tempfile.mkdtemp(prefix='mlens_')
+        return self
+
+    def close(self):
+        """Terminate the pool of workers started by :meth:`open`.
+
+        Inputs kept mapped while open are removed.
+        """
+        parallel = getattr(self, '_parallel', None)
+        if parallel is not None:
+            parallel.__exit__(None, None, None)
+            self._parallel = None
+
+            # Release memmaps before removing their files
+            self._inputs = None
+            gc.collect()
+            shutil.rmtree(self._input_dir, ignore_errors=True)
+            self._input_dir = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        # A pool of workers cannot be pickled
+        state = super(LayerContainer, self).__getstate__()
+        for key in ['_parallel', '_inputs', '_input_dir']:
+            state.pop(key, None)
+        return state
+
     def add(self, estimators, cls, indexer=None, preprocessing=None, **kwargs):
         """Method for adding a layer.
 
@@ -313,6 +439,9 @@ class LayerContainer(BaseEstimator):
                        file=pout, flush=True, end="\n\n")
             t0 = time()
 
+        if self._use_memory(X, job):
+            kwargs['in_memory'] = True
+
         # Initialize cache
         processor = ParallelProcessing(self)
         processor.initialize(job, X, *args, **kwargs)
@@ -332,6 +461,51 @@ class LayerContainer(BaseEstimator):
 
         return preds
 
+    def _predict_blocks(self, blocks):
+        """Predict on a sequence of row blocks, reusing prediction arrays.
+
+        Blocks are processed in memory regardless of ``in_memory``. The
+        prediction arrays of every layer are allocated for the first block
+        and reused for subsequent blocks, which can be smaller but not larger.
+
+        Parameters
+        ----------
+        blocks : iterable
+            arrays of shape = [n_block_samples, n_features].
+
+        Yields
+        ------
+        P : array-like of shape = [n_block_samples, n_fitted_estimators]
+            predictions from final layer. Overwritten by the next block.
+        """
+        buffers = None
+        for X in blocks:
+            processor = ParallelProcessing(self)
+            processor.initialize('predict', X, in_memory=True,
+                                 buffers=buffers)
+            try:
+                processor.process()
+
+                if buffers is None:
+                    buffers = processor.job.P[1:]
+
+                yield processor.get_preds()
+            finally:
+                processor.terminate()
+
+    def _use_memory(self, X, job):
+        """Check whether to predict without caching arrays on disk."""
+        if job != 'predict' or isinstance(X, str):
+            # File inputs are not read into memory
+            return False
+
+        if isinstance(self.in_memory, bool):
+            return self.in_memory
+
+        # Only threads can share in-memory arrays, so with other backends
+        # small batches would be predicted sequentially
+        return self.backend == 'threading' and X.shape[0] <= self.in_memory
+
     def _post_process(self, processor, return_preds):
         """Aggregate output from processing layers and _collect final preds."""
         out = {'score_mean': {}, 'score_std': {}}
@@ -494,15 +668,40 @@ class Layer(BaseEstimator):
     cls_kwargs : dict or None
         optional arguments to pass to the layer type class.
 
+    fold_store : str or None (default = None)
+        directory to keep estimators fitted on folds in. If set, these are
+        only loaded when the layer is used to ``transform``, and are stored
+        in ``fold_estimators_`` rather than ``estimators_``. The directory
+        must be available wherever the fitted layer is used.
+
+    fold_cache : int (default = 10)
+        maximum number of fold estimators from ``fold_store`` to keep in
+        memory.
+
     Attributes
     ----------
     estimators\_ : OrderedDict, list
         container for fitted estimators, possibly mapped to preprocessing
         cases and / or folds.
 
+    fold_estimators\_ : :class:`mlens.parallel.store.FoldStore`
+        lazily loaded estimators fitted on folds, if ``fold_store`` is set.
+
+    fit_state\_ : dict, None
+        fingerprint of the training data, hashes of the fitted estimators and
+        the training predictions of the layer. The predictions take as much
+        memory as the layer's output on the training set, so the state is
+        only kept if the layer is fitted with ``warm_start``, and is not
+        pickled with the layer. Use ``memory`` to reuse fitted estimators
+        across sessions.
+
     preprocessing\_ : OrderedDict, list
         container for fitted preprocessing pipelines, possibly mapped to
         preprocessing cases and / or folds.
+
+    timings\_ : :class:`mlens.parallel.profile.Profile`
+        measurements of each task of the last ``fit``, ``predict`` and
+        ``transform`` call.
     """
 
     def __init__(self,
@@ -516,7 +715,9 @@ class Layer(BaseEstimator):
                  raise_on_exception=False,
                  name=None,
                  verbose=False,
-                 cls_kwargs=None):
+                 cls_kwargs=None,
+                 fold_store=None,
+                 fold_cache=10):
 
         assert_correct_format(estimators, preprocessing)
 
@@ -532,6 +733,8 @@ class Layer(BaseEstimator):
         self.raise_on_exception = raise_on_exception
         self.name = name
         self.verbose = verbose
+        self.fold_store = fold_store
+        self.fold_cache = fold_cache
 
         self._store_layer_data()
 
@@ -565,6 +768,37 @@ class Layer(BaseEstimator):
             self.n_pred *= self.indexer.n_partitions
             self.n_prep *= self.indexer.n_partitions
 
+    def __getstate__(self):
+        # Training predictions are only needed to warm start this session
+        state = super(Layer, self).__getstate__()
+        state.pop('fit_state_', None)
+        return state
+
+    def set_params(self, **params):
+        """Set the parameters of this estimator.
+
+        Setting ``estimators`` or ``preprocessing`` replaces the layer's
+        instances. With ``warm_start``, the next call to ``fit`` only fits
+        new or changed estimators.
+
+        Returns
+        -------
+        self : instance
+            layer with updated parameters.
+        """
+        instances = {key: params.pop(key) for key in
+                     ['estimators', 'preprocessing'] if key in params}
+        if instances:
+            ests = instances.get('estimators', self.estimators)
+            prep = instances.get('preprocessing', self.preprocessing)
+            assert_correct_format(ests, prep)
+
+            self.estimators = check_instances(ests)
+            self.preprocessing = check_instances(prep)
+            self._store_layer_data()
+
+        return super(Layer, self).set_params(**params)
+
     def get_params(self, deep=True):
         """Get parameters for this estimator.
 
@@ -616,7 +850,12 @@ class BaseEnsemble(BaseEstimator):
                  n_jobs=-1,
                  layers=None,
                  array_check=2,
-                 backend='multiprocessing'):
+                 backend='multiprocessing',
+                 scheduler=False,
+                 in_memory=1000,
+                 dtype=np.float64,
+                 warm_start=False,
+                 memory=None):
 
         self.shuffle = shuffle
         self.random_state = random_state
@@ -627,6 +866,11 @@ class BaseEnsemble(BaseEstimator):
         self.layers = layers
         self.array_check = array_check
         self.backend = backend
+        self.scheduler = scheduler
+        self.in_memory = in_memory
+        self.dtype = dtype
+        self.warm_start = warm_start
+        self.memory = memory
 
     def _add(self,
              estimators,
@@ -654,6 +898,11 @@ class BaseEnsemble(BaseEstimator):
                             n_jobs=self.n_jobs,
                             raise_on_exception=self.raise_on_exception,
                             backend=self.backend,
+                            memory=self.memory,
+                            warm_start=self.warm_start,
+                            dtype=self.dtype,
+                            in_memory=self.in_memory,
+                            scheduler=self.scheduler,
                             verbose=self.verbose)
 
         # Add layer to Layer Container
@@ -672,6 +921,58 @@ class BaseEnsemble(BaseEstimator):
 
         return self
 
+    def open(self):
+        """Start a pool of workers to reuse across ``fit`` and ``predict``.
+
+        Pool start-up can dominate the time of predicting on small batches.
+        An open ensemble keeps its workers alive, and the last inputs it was
+        given mapped, until :meth:`close` is called (see
+        :meth:`LayerContainer.open`). The ensemble can also be used as a
+        context manager::
+
+            with ensemble:
+                ensemble.fit(X, y)
+                preds = ensemble.predict(X)
+
+        Returns
+        -------
+        self : instance
+            ensemble with an open pool of workers.
+        """
+        check_ensemble_build(self)
+        self.layers.open()
+        return self
+
+    def close(self):
+        """Terminate the pool of workers started by :meth:`open`."""
+        if getattr(self, 'layers', None) is not None:
+            self.layers.close()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def freeze(self):
+        """Build a prediction-only copy of the fitted ensemble.
+
+        The copy keeps only estimators and preprocessing pipelines fitted on
+        the full training set and predicts in memory. Use it to deploy a
+        fitted ensemble: estimators fitted on folds are not needed for
+        prediction and can make up most of the size of the ensemble.
+
+        Returns
+        -------
+        frozen : :class:`mlens.ensemble.frozen.FrozenEnsemble`
+            picklable prediction-only ensemble.
+        """
+        if not check_ensemble_build(self):
+            # No layers instantiated, but raise_on_exception is False
+            return
+
+        return FrozenEnsemble(self)
+
     def fit(self, X, y=None):
         """Fit ensemble.
 
@@ -700,6 +1001,9 @@ class BaseEnsemble(BaseEstimator):
             X, y = X[idx], y[idx]
 
         self.scores_ = self.layers.fit(X, y)
+        self.profile_ = Profile(
+            r for layer in self.layers.layers.values()
+            for r in getattr(layer, 'timings_', []) if r['job'] == 'fit')
 
         return self
 
@@ -735,3 +1039,92 @@ class BaseEnsemble(BaseEstimator):
             y = y.ravel()
 
         return y
+
+    def iter_predict(self, X, chunk_size=10000):
+        """Predict with fitted ensemble one block of rows at a time.
+
+        Blocks are streamed through all layers in memory with prediction
+        matrices allocated once. Hence, memory use depends on ``chunk_size``
+        rather than the size of ``X``, which can be a memmap or a path to a
+        ``.npy`` file. Estimators run sequentially, or on threads if
+        ``backend='threading'``.
+
+        Parameters
+        ----------
+        X : array-like of shape = [n_samples, n_features] or str
+            input matrix to be used for prediction.
+
+        chunk_size : int (default = 10000)
+            number of rows in each block.
+
+        Yields
+        ------
+        y_pred : array-like, shape=[n_chunk_samples, ]
+            predictions for the next block of rows.
+        """
+        for y in self._predict_chunks(X, chunk_size):
+            yield y.copy()
+
+    def predict_chunked(self, X, chunk_size=10000, out=None):
+        """Predict with fitted ensemble one block of rows at a time.
+
+        See :meth:`iter_predict` for details.
+
+        Parameters
+        ----------
+        X : array-like of shape = [n_samples, n_features] or str
+            input matrix to be used for prediction.
+
+        chunk_size : int (default = 10000)
+            number of rows in each block.
+
+        out : array-like or str, optional
+            array to write predictions to, such as a memmap, or path of a
+            ``.npy`` file to create. If ``None``, an array is allocated.
+
+        Returns
+        -------
+        y_pred : array-like, shape=[n_samples, ]
+            predictions for provided input array. Empty if ``X`` has no
+            rows.
+        """
+        if isinstance(X, str):
+            X = np.load(X, mmap_mode='r')
+
+        if X.shape[0] == 0 and self.layers is not None:
+            # No blocks to predict: get the output shape from the last layer
+            layer = list(self.layers.layers.values())[-1]
+            check_is_fitted(layer, 'estimators_')
+            width = layer.n_pred * (layer.classes_ if layer.proba else 1)
+            shape = (0,) if width == 1 else (0, width)
+            return _allocate(out, shape, self.layers.dtype)
+
+        i = 0
+        for y in self._predict_chunks(X, chunk_size):
+            if i == 0:
+                out = _allocate(out, (X.shape[0],) + y.shape[1:], y.dtype)
+            out[i:i + y.shape[0]] = y
+            i += y.shape[0]
+
+        return out
+
+    def _predict_chunks(self, X, chunk_size):
+        """Generate predictions on blocks of rows.
+
+        Predictions are views of arrays reused for the next block.
+        """
+        if not check_ensemble_build(self):
+            # No layers instantiated, but raise_on_exception is False
+            return
+
+        if isinstance(X, str):
+            X = np.load(X, mmap_mode='r')
+
+        blocks = (check_inputs(X[i:i + chunk_size],
+                               check_level=self.array_check)[0]
+                  for i in range(0, X.shape[0], chunk_size))
+
+        for y in self.layers._predict_blocks(blocks):
+            if y.shape[1] == 1:
+                y = y.ravel()
+            yield y
@@ -9,6 +9,8 @@ Blend Ensemble class. Fully integrable with Scikit-learn.
 
 from __future__ import division
 
+import numpy as np
+
 from .base import BaseEnsemble
 from ..base import BlendIndex, FullIndex
 
@@ -102,6 +104,37 @@ class BlendEnsemble(BaseEnsemble):
         :class:`mlens.externals.joblib.Parallel`. See Joblib for further
         documentation.
 
+    scheduler : bool (default = False)
+        whether to process all layers as one graph of tasks. A task is then
+        dispatched as soon as the predictions it depends on are written,
+        rather than when all tasks in the previous layer have completed.
+
+    in_memory : bool or int (default = 1000)
+        whether to predict without caching arrays on disk. Estimators are then
+        run sequentially, or on threads if ``backend='threading'``. If an
+        int, predictions are made in memory when ``backend='threading'`` and
+        ``X`` has at most ``in_memory`` rows. Avoids the overhead of the cache
+        on small batches.
+
+    dtype : numpy dtype (default = numpy.float64)
+        data type of the prediction matrices passed between layers and of
+        the final predictions. Use ``numpy.float32`` to halve the memory
+        and disk footprint of large prediction matrices.
+
+    warm_start : bool (default = False)
+        whether to keep estimators from the previous call to ``fit``.
+        Estimators fitted on the same data, with unchanged parameters,
+        preprocessing and folds, are not refitted, and unchanged layers are
+        skipped. Layers are then fitted one at a time, even if
+        ``scheduler=True``.
+
+    memory : str or None (default = None)
+        directory to cache fitted transformers and estimators in. Entries are
+        keyed on a hash of the training data, the folds and the parameters of
+        each estimator and its preprocessing, so refitting the ensemble, or
+        another ensemble, only fits estimators not in the cache. Layers are
+        then fitted one at a time, even if ``scheduler=True``.
+
     Attributes
     ----------
     scores\_ : dict
@@ -109,6 +142,11 @@ class BlendEnsemble(BaseEnsemble):
         with cross-validated scores assembled during ``fit`` call. The fold
         structure used for scoring is determined by ``folds``.
 
+    profile\_ : :class:`mlens.parallel.profile.Profile`
+        duration, input size, memory use and worker of each task of the
+        ``fit`` call. Print with ``profile_.table()`` to find slow estimators
+        and folds.
+
     Examples
     --------
 
@@ -168,13 +206,23 @@ class BlendEnsemble(BaseEnsemble):
                  verbose=False,
                  n_jobs=-1,
                  backend='multiprocessing',
-                 layers=None):
+                 layers=None,
+                 scheduler=False,
+                 in_memory=1000,
+                 dtype=np.float64,
+                 warm_start=False,
+                 memory=None):
 
         super(BlendEnsemble, self).__init__(
                 shuffle=shuffle, random_state=random_state,
                 scorer=scorer, raise_on_exception=raise_on_exception,
                 array_check=array_check, verbose=verbose, n_jobs=n_jobs,
-                layers=layers, backend=backend)
+                layers=layers, backend=backend,
+                scheduler=scheduler,
+                in_memory=in_memory,
+                dtype=dtype,
+                warm_start=warm_start,
+                memory=memory)
 
         self.test_size = test_size
 
@@ -187,7 +235,7 @@ class BlendEnsemble(BaseEnsemble):
         return self.add(estimators=estimator, meta=True)
 
     def add(self, estimators, preprocessing=None, test_size=None,
-            proba=False, meta=False):
+            proba=False, meta=False, fold_store=None, fold_cache=10):
         """Add layer to ensemble.
 
         Parameters
@@ -254,6 +302,18 @@ class BlendEnsemble(BaseEnsemble):
         meta : bool (default = False)
             Whether the layer should be treated as the final meta estimator.
 
+        fold_store : str or None (default = None)
+            directory to keep estimators fitted on folds in. If set, these
+            are only loaded when the layer is used to ``transform``. The
+            directory must be available wherever the fitted ensemble is used.
+            See :class:`mlens.ensemble.base.Layer`. Blend layers fit no
+            estimators on folds, so nothing is stored, but the option is
+            accepted as for other ensembles.
+
+        fold_cache : int (default = 10)
+            maximum number of fold estimators from ``fold_store`` to keep in
+            memory.
+
         Returns
         -------
         self : instance
@@ -273,4 +333,6 @@ class BlendEnsemble(BaseEnsemble):
                 preprocessing=preprocessing,
                 indexer=idx,
                 proba=proba,
+                fold_store=fold_store,
+                fold_cache=fold_cache,
                 verbose=self.verbose)
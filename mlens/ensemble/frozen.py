@@ -0,0 +1,129 @@
+"""ML-ENSEMBLE
+
+:author: Sebastian Flennerhag
+:copyright: 2017
+:licence: MIT
+
+Prediction-only copies of fitted ensembles.
+"""
+
+import numpy as np
+
+from ..utils import check_inputs, check_is_fitted
+
+
+class FrozenLayer(object):
+
+    """Prediction-only copy of a fitted layer.
+
+    Holds only the estimators and preprocessing pipelines fitted on the full
+    training set. Estimators are grouped by preprocessing case so that each
+    case is transformed once, and the columns each estimator writes to are
+    computed up front.
+
+    Parameters
+    ----------
+    layer : :class:`mlens.ensemble.base.Layer`
+        fitted layer to freeze.
+
+    dtype : numpy dtype (default = numpy.float64)
+        data type of the prediction matrix.
+    """
+
+    def __init__(self, layer, dtype=np.float64):
+        check_is_fitted(layer, 'estimators_')
+
+        self.name = layer.name
+        self.dtype = dtype
+        self.attr = 'predict' if not layer.proba else 'predict_proba'
+
+        width = layer.classes_ if layer.proba else 1
+        self.n_cols = layer.n_pred * width
+
+        if layer.preprocessing_ is None:
+            prep = dict()
+        else:
+            prep = dict(layer.preprocessing_[:max(layer.n_prep, 1)])
+
+        # List of (transformers, [(estimator, columns)]) with cases in the
+        # order they were fitted
+        cases, index = list(), dict()
+        for case, (_, est, (_, col)) in layer.estimators_[:layer.n_pred]:
+            if case not in index:
+                index[case] = len(cases)
+                cases.append(([tr for _, tr in prep.get(case, [])], []))
+
+            cols = col if width == 1 else slice(col, col + width)
+            cases[index[case]][1].append((est, cols))
+
+        self.cases = cases
+
+    def predict(self, X):
+        """Predict with the layer.
+
+        Parameters
+        ----------
+        X : array-like of shape = [n_samples, n_features]
+            input matrix.
+
+        Returns
+        -------
+        P : array of shape = [n_samples, n_cols]
+            prediction matrix of the layer.
+        """
+        P = np.zeros((X.shape[0], self.n_cols), dtype=self.dtype)
+        for transformers, estimators in self.cases:
+            x = X
+            for tr in transformers:
+                x = tr.transform(x)
+
+            for est, cols in estimators:
+                P[:, cols] = getattr(est, self.attr)(x)
+        return P
+
+
+class FrozenEnsemble(object):
+
+    """Prediction-only copy of a fitted ensemble.
+
+    Built by the ``freeze`` method of an ensemble. Estimators fitted on folds
+    are dropped, so the object is a fraction of the size of the ensemble, and
+    predictions are made in memory without the estimation cache.
+
+    Parameters
+    ----------
+    ensemble : :class:`mlens.ensemble.base.BaseEnsemble`
+        fitted ensemble to freeze.
+
+    See Also
+    --------
+    :class:`FrozenLayer`
+    """
+
+    def __init__(self, ensemble):
+        self.array_check = ensemble.array_check
+        self.layers = [FrozenLayer(lyr, ensemble.layers.dtype)
+                       for lyr in ensemble.layers.layers.values()]
+
+    def predict(self, X):
+        """Predict with the frozen ensemble.
+
+        Parameters
+        ----------
+        X : array-like, shape=[n_samples, n_features]
+            input matrix to be used for prediction.
+
+        Returns
+        -------
+        y_pred : array-like, shape=[n_samples, ]
+            predictions for provided input array.
+        """
+        X, _ = check_inputs(X, check_level=self.array_check)
+
+        for layer in self.layers:
+            X = layer.predict(X)
+
+        if X.shape[1] == 1:
+            X = X.ravel()
+
+        return X
@@ -9,6 +9,8 @@ Subsemble class. Fully integrable with Scikit-learn.
 
 from __future__ import division
 
+import numpy as np
+
 from .base import BaseEnsemble
 from ..base import FullIndex, SubsetIndex
 
@@ -148,6 +150,37 @@ class Subsemble(BaseEnsemble):
         :class:`mlens.externals.joblib.Parallel`. See Joblib for further
         documentation.
 
+    scheduler : bool (default = False)
+        whether to process all layers as one graph of tasks. A task is then
+        dispatched as soon as the predictions it depends on are written,
+        rather than when all tasks in the previous layer have completed.
+
+    in_memory : bool or int (default = 1000)
+        whether to predict without caching arrays on disk. Estimators are then
+        run sequentially, or on threads if ``backend='threading'``. If an
+        int, predictions are made in memory when ``backend='threading'`` and
+        ``X`` has at most ``in_memory`` rows. Avoids the overhead of the cache
+        on small batches.
+
+    dtype : numpy dtype (default = numpy.float64)
+        data type of the prediction matrices passed between layers and of
+        the final predictions. Use ``numpy.float32`` to halve the memory
+        and disk footprint of large prediction matrices.
+
+    warm_start : bool (default = False)
+        whether to keep estimators from the previous call to ``fit``.
+        Estimators fitted on the same data, with unchanged parameters,
+        preprocessing and folds, are not refitted, and unchanged layers are
+        skipped. Layers are then fitted one at a time, even if
+        ``scheduler=True``.
+
+    memory : str or None (default = None)
+        directory to cache fitted transformers and estimators in. Entries are
+        keyed on a hash of the training data, the folds and the parameters of
+        each estimator and its preprocessing, so refitting the ensemble, or
+        another ensemble, only fits estimators not in the cache. Layers are
+        then fitted one at a time, even if ``scheduler=True``.
+
     Attributes
     ----------
     scores\_ : dict
@@ -155,6 +188,11 @@ class Subsemble(BaseEnsemble):
         with cross-validated scores assembled during ``fit`` call. The fold
         structure used for scoring is determined by ``folds``.
 
+    profile\_ : :class:`mlens.parallel.profile.Profile`
+        duration, input size, memory use and worker of each task of the
+        ``fit`` call. Print with ``profile_.table()`` to find slow estimators
+        and folds.
+
     Examples
     --------
 
@@ -214,13 +252,23 @@ class Subsemble(BaseEnsemble):
                  verbose=False,
                  n_jobs=-1,
                  backend='multiprocessing',
-                 layers=None):
+                 layers=None,
+                 scheduler=False,
+                 in_memory=1000,
+                 dtype=np.float64,
+                 warm_start=False,
+                 memory=None):
 
         super(Subsemble, self).__init__(
                 shuffle=shuffle, random_state=random_state,
                 scorer=scorer, raise_on_exception=raise_on_exception,
                 verbose=verbose, n_jobs=n_jobs, layers=layers,
-                array_check=array_check, backend=backend)
+                array_check=array_check, backend=backend,
+                scheduler=scheduler,
+                in_memory=in_memory,
+                dtype=dtype,
+                warm_start=warm_start,
+                memory=memory)
 
         self.partitions = partitions
         self.folds = folds
@@ -230,7 +278,8 @@ class Subsemble(BaseEnsemble):
         return self.add(estimators, meta=True)
 
     def add(self, estimators, preprocessing=None, meta=False,
-            partitions=None, folds=None, proba=False):
+            partitions=None, folds=None, proba=False, fold_store=None,
+            fold_cache=10):
         """Add layer to ensemble.
 
         Parameters
@@ -305,6 +354,16 @@ class Subsemble(BaseEnsemble):
         proba : bool (default = False)
             whether to call ``predict_proba`` on base learners.
 
+        fold_store : str or None (default = None)
+            directory to keep estimators fitted on folds in. If set, these
+            are only loaded when the layer is used to ``transform``. The
+            directory must be available wherever the fitted ensemble is used.
+            See :class:`mlens.ensemble.base.Layer`.
+
+        fold_cache : int (default = 10)
+            maximum number of fold estimators from ``fold_store`` to keep in
+            memory.
+
         Returns
         -------
         self : instance
@@ -325,4 +384,6 @@ class Subsemble(BaseEnsemble):
                          preprocessing=preprocessing,
                          indexer=idx,
                          proba=proba,
+                         fold_store=fold_store,
+                         fold_cache=fold_cache,
                          verbose=self.verbose)
@@ -35,3 +35,14 @@ def test_run():
     pred = ens.predict(X)
 
     np.testing.assert_array_equal(pred, g)
+
+
+def test_freeze():
+    """[Blend] test 'predict' with a frozen ensemble."""
+    ens = BlendEnsemble(test_size=3)
+    ens.add(ESTIMATORS, PREPROCESSING)
+    ens.add_meta(OLS())
+    ens.fit(X, y)
+
+    frozen = ens.freeze()
+    np.testing.assert_array_equal(frozen.predict(X), ens.predict(X))
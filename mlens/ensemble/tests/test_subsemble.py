@@ -3,10 +3,12 @@
 
 """
 import numpy as np
-from mlens.utils.dummy import OLS, ECM
+from mlens.utils.dummy import OLS, ECM, Scale
+from mlens.metrics import rmse
 from mlens.base import SubsetIndex
 
-from mlens.parallel.subset import _expand_instance_list, _get_col_idx
+from mlens.parallel.estimation import _col_idx, _describe
+from mlens.parallel.subset import _expand_instance_list
 
 from mlens.ensemble import Subsemble, SuperLearner
 
@@ -25,7 +27,7 @@ def ground_truth():
     P = np.zeros((12, 2 * 2))
     F = np.zeros((12, 2 * 2))
 
-    cols = _get_col_idx(e, 2, 1)
+    cols = _col_idx(e, _describe(e, 2))
 
     for name, tri, tei, est_list in e:
         for est_name, est in est_list:
@@ -77,3 +79,28 @@ def test_subset_equiv():
     P = sl.fit(X, y).predict(X)
 
     np.testing.assert_array_equal(P, F)
+
+
+def test_subset_scores_w_preprocessing():
+    """[Subsemble] test scoring with preprocessing cases."""
+    ens = Subsemble(partitions=2, folds=3, scorer=rmse)
+    ens.add({'sc': [('ols', OLS())], 'no': [('ols', OLS(1))]},
+            {'sc': [('sc', Scale())], 'no': []})
+    ens.add_meta(OLS())
+    ens.fit(X, y)
+
+    scores = ens.scores_['score_mean']
+    assert sorted(name for _, name in scores) == \
+        ['no__j0__ols', 'no__j1__ols', 'sc__j0__ols', 'sc__j1__ols']
+    assert all(np.isfinite(s) for s in scores.values())
+
+
+def test_subset_freeze():
+    """[Subsemble] test 'predict' with a frozen ensemble."""
+    ens = Subsemble()
+    ens.add(estimators, partitions=2, folds=3)
+    ens.add_meta(OLS())
+    ens.fit(X, y)
+
+    frozen = ens.freeze()
+    np.testing.assert_array_equal(frozen.predict(X), ens.predict(X))
@@ -6,11 +6,16 @@ Place holder for more rigorous tests.
 import numpy as np
 from mlens.metrics import rmse
 from mlens.base import FoldIndex
-from mlens.utils.dummy import Data, OLS, PREPROCESSING, ESTIMATORS, ECM
+from mlens.utils.dummy import (Data, OLS, PREPROCESSING, ESTIMATORS, ECM,
+                               ESTIMATORS_PROBA)
 
 from mlens.ensemble import SuperLearner
+from mlens.externals.joblib.parallel import JOBLIB_SPAWNED_PROCESS
 
 import os
+import pickle
+import shutil
+import tempfile
 try:
     from contextlib import redirect_stdout
 except ImportError:
@@ -107,3 +112,319 @@ def test_scores_wo_folds():
     for k in scores:
 
         assert scores[k] == ens2.scores_['score_mean'][('layer-1', k)]
+
+
+def test_open_pool():
+    """[SuperLearner] test 'fit' and 'predict' with a persistent pool."""
+    ens = SuperLearner(folds=FOLDS, n_jobs=2)
+    ens.add(ESTIMATORS, PREPROCESSING)
+    ens.add_meta(OLS())
+
+    with ens:
+        parallel = ens.layers._parallel
+        assert parallel is not None
+
+        ens.fit(X1, y1)
+        pred = ens.predict(X1)
+
+        assert ens.layers._parallel is parallel
+        unpickled = pickle.loads(pickle.dumps(ens))
+        assert getattr(unpickled.layers, '_parallel', None) is None
+
+    np.testing.assert_array_equal(pred, G1)
+    assert ens.layers._parallel is None
+
+
+def test_open_pool_inputs():
+    """[SuperLearner] test inputs are kept mapped while the pool is open."""
+    ens = SuperLearner(folds=FOLDS, n_jobs=2, in_memory=False)
+    ens.add(ESTIMATORS, PREPROCESSING)
+    ens.add_meta(OLS())
+
+    with ens:
+        dir = ens.layers._input_dir
+        ens.fit(X1, y1)
+        X = ens.layers._inputs['X'][1]
+
+        np.testing.assert_array_equal(ens.predict(X1.copy()), G1)
+        assert ens.layers._inputs['X'][1] is X
+        assert set(f.split('.')[0] for f in os.listdir(dir)) == {'X', 'y'}
+
+        ens.predict(X1[::-1])
+        assert ens.layers._inputs['X'][1] is not X
+
+    assert not os.path.exists(dir)
+    assert ens.layers._inputs is None
+
+
+def test_open_pool_nested():
+    """[SuperLearner] test a pool opened in a joblib worker uses threads."""
+    ens = SuperLearner(folds=FOLDS, n_jobs=2)
+    ens.add(ESTIMATORS, PREPROCESSING)
+    ens.add_meta(OLS())
+
+    os.environ[JOBLIB_SPAWNED_PROCESS] = '1'
+    try:
+        with ens:
+            assert ens.layers._parallel.backend == 'threading'
+            pred = ens.fit(X1, y1).predict(X1)
+        assert os.environ.get(JOBLIB_SPAWNED_PROCESS) == '1'
+    finally:
+        os.environ.pop(JOBLIB_SPAWNED_PROCESS, None)
+
+    np.testing.assert_array_equal(pred, G1)
+
+
+def test_in_memory():
+    """[SuperLearner] test 'predict' without the estimation cache."""
+    for backend, in_memory in [('multiprocessing', True),
+                               ('threading', True),
+                               ('threading', False),
+                               ('threading', 3)]:
+        ens = SuperLearner(folds=FOLDS, backend=backend, in_memory=in_memory)
+        ens.add(ESTIMATORS, PREPROCESSING)
+        ens.add_meta(OLS())
+        ens.fit(X1, y1)
+
+        np.testing.assert_array_equal(ens.predict(X1), G1)
+        if in_memory is not False:
+            # Fewer rows than folds
+            np.testing.assert_array_equal(ens.predict(X1[:1]), G1[:1])
+
+
+def test_in_memory_n_jobs():
+    """[SuperLearner] test small batches are predicted on all workers."""
+    ens = SuperLearner(folds=FOLDS, n_jobs=2, backend='multiprocessing')
+    ens.add(ESTIMATORS, PREPROCESSING)
+    ens.add_meta(OLS())
+    ens.fit(X1, y1)
+
+    # Fewer rows than the in_memory threshold
+    np.testing.assert_array_equal(ens.predict(X1), G1)
+
+    records = [r for r in ens.layers.layers['layer-1'].timings_
+               if r['job'] == 'predict']
+    assert records
+    assert os.getpid() not in [r['pid'] for r in records]
+
+
+def test_freeze():
+    """[SuperLearner] test 'predict' with a frozen ensemble."""
+    ens = SuperLearner(folds=FOLDS)
+    ens.add(ESTIMATORS, PREPROCESSING)
+    ens.add_meta(OLS())
+    ens.fit(X1, y1)
+
+    frozen = pickle.loads(pickle.dumps(ens.freeze()))
+    np.testing.assert_array_equal(frozen.predict(X1), G1)
+    assert len(pickle.dumps(frozen)) < len(pickle.dumps(ens))
+
+
+def test_freeze_proba():
+    """[SuperLearner] test a frozen ensemble with a 'proba' layer."""
+    X, y = Data('stack', True, True, FOLDS).get_data((LEN, WIDTH), MOD)
+
+    ens = SuperLearner(folds=FOLDS)
+    ens.add(ESTIMATORS_PROBA, PREPROCESSING, proba=True)
+    ens.fit(X, y)
+
+    pred = ens.freeze().predict(X)
+    assert pred.shape == (LEN, 2 * ens.layer_1.n_pred)
+    np.testing.assert_array_equal(pred, ens.predict(X))
+
+    ens.add_meta(OLS())
+    ens.fit(X, y)
+    np.testing.assert_array_equal(ens.freeze().predict(X), ens.predict(X))
+
+
+def test_fold_store():
+    """[SuperLearner] test 'transform' with fold estimators kept on disk."""
+    ref = SuperLearner(folds=FOLDS)
+    ref.add(ESTIMATORS, PREPROCESSING)
+    ref.add_meta(OLS())
+    ref.fit(X1, y1)
+
+    dir = tempfile.mkdtemp()
+    try:
+        ens = SuperLearner(folds=FOLDS)
+        ens.add(ESTIMATORS, PREPROCESSING, fold_store=dir, fold_cache=2)
+        ens.add_meta(OLS())
+        ens.fit(X1, y1)
+
+        layer = ens.layer_1
+        assert len(layer.estimators_) == layer.n_pred
+        assert len(layer.fold_estimators_._cache) == 0
+
+        np.testing.assert_array_equal(ens.layers.transform(X1),
+                                      ref.layers.transform(X1))
+        assert len(layer.fold_estimators_._cache) == 2
+        np.testing.assert_array_equal(ens.predict(X1), G1)
+    finally:
+        shutil.rmtree(dir)
+
+
+def test_dtype():
+    """[SuperLearner] test 'fit' and 'predict' with float32 predictions."""
+    for in_memory in [True, False]:
+        ens = SuperLearner(folds=FOLDS, dtype=np.float32, in_memory=in_memory)
+        ens.add(ESTIMATORS, PREPROCESSING)
+        ens.add_meta(OLS())
+        ens.fit(X1, y1)
+
+        for pred in [ens.predict(X1), ens.freeze().predict(X1)]:
+            assert pred.dtype == np.float32
+            np.testing.assert_array_almost_equal(pred, G1, 4)
+
+
+def test_predict_chunked():
+    """[SuperLearner] test 'predict' on blocks of rows."""
+    ens = SuperLearner(folds=FOLDS)
+    ens.add(ESTIMATORS, PREPROCESSING)
+    ens.add_meta(OLS())
+    ens.fit(X1, y1)
+
+    np.testing.assert_array_equal(
+        np.hstack(list(ens.iter_predict(X1, chunk_size=4))), G1)
+
+    f = os.path.join(os.getcwd(), 'preds.npy')
+    try:
+        ens.predict_chunked(X1, chunk_size=4, out=f)
+        np.testing.assert_array_equal(np.load(f), G1)
+    finally:
+        os.remove(f)
+
+    # No rows to predict
+    pred = ens.predict_chunked(X1[:0])
+    assert pred.shape == (0,) and pred.dtype == G1.dtype
+
+
+def test_warm_start():
+    """[SuperLearner] test 'fit' only fits new estimators with warm start."""
+    ref = SuperLearner(folds=FOLDS, scorer=rmse)
+    ref.add(ECM)
+    ref.add_meta(OLS())
+    ref.fit(X1, y1)
+
+    ens = SuperLearner(folds=FOLDS, scorer=rmse, warm_start=True)
+    ens.add(ECM[:2])
+    ens.add_meta(OLS())
+    ens.fit(X1, y1)
+
+    fitted = {name: est for _, (name, est, _) in ens.layer_1.estimators_}
+    ens.fit(X1, y1)
+    for _, (name, est, _) in ens.layer_1.estimators_:
+        assert est is fitted[name]
+
+    ens.layer_1.set_params(estimators=ECM)
+    ens.fit(X1, y1)
+    np.testing.assert_array_equal(ens.predict(X1), ref.predict(X1))
+    assert ens.scores_ == ref.scores_
+
+    n_new = 0
+    for _, (name, est, _) in ens.layer_1.estimators_:
+        if name in fitted:
+            assert est is fitted[name]
+        else:
+            n_new += 1
+    assert n_new == 2 * (FOLDS + 1)
+
+    # Training predictions are neither pickled nor kept without warm start
+    assert ens.layer_1.fit_state_ is not None
+    assert not hasattr(pickle.loads(pickle.dumps(ens)).layer_1, 'fit_state_')
+
+    ens.layers.warm_start = False
+    ens.fit(X1, y1)
+    assert ens.layer_1.fit_state_ is None
+
+
+def test_memory():
+    """[SuperLearner] test 'fit' loads cached estimators from 'memory'."""
+    ref = SuperLearner(folds=FOLDS, scorer=rmse)
+    ref.add(ECM)
+    ref.add_meta(OLS(offset=1))
+    ref.fit(X1, y1)
+
+    memory = tempfile.mkdtemp()
+    try:
+        ens = SuperLearner(folds=FOLDS, scorer=rmse, memory=memory)
+        ens.add(ECM)
+        ens.add_meta(OLS())
+        ens.fit(X1, y1)
+        n_cached = len(os.listdir(memory))
+
+        ens = SuperLearner(folds=FOLDS, scorer=rmse, memory=memory)
+        ens.add(ECM)
+        ens.add_meta(OLS(offset=1))
+        ens.fit(X1, y1)
+
+        # Only the meta layer is fitted anew
+        assert len(os.listdir(memory)) == n_cached + 1
+        np.testing.assert_array_equal(ens.predict(X1), ref.predict(X1))
+        assert ens.scores_ == ref.scores_
+    finally:
+        shutil.rmtree(memory)
+
+
+def test_memory_corrupt():
+    """[SuperLearner] test 'fit' refits corrupted entries in 'memory'."""
+    memory = tempfile.mkdtemp()
+    try:
+        ens = SuperLearner(folds=FOLDS, scorer=rmse, memory=memory)
+        ens.add(ECM)
+        ens.add_meta(OLS())
+        ens.fit(X1, y1)
+        pred = ens.predict(X1)
+
+        files = sorted(os.listdir(memory))
+        for f in files:
+            with open(os.path.join(memory, f), 'r+b') as fh:
+                fh.truncate(10)
+
+        ens.fit(X1, y1)
+        np.testing.assert_array_equal(ens.predict(X1), pred)
+
+        # Entries are written anew
+        assert sorted(os.listdir(memory)) == files
+        for f in files:
+            assert os.path.getsize(os.path.join(memory, f)) > 10
+    finally:
+        shutil.rmtree(memory)
+
+
+def test_profile():
+    """[SuperLearner] test tasks are measured in 'profile_'."""
+    for scheduler in [False, True]:
+        ens = SuperLearner(folds=FOLDS, scheduler=scheduler)
+        ens.add(ECM)
+        ens.add_meta(OLS())
+        ens.fit(X1, y1)
+
+        # One task per estimator and fold, and the meta layer's estimator
+        # and (empty) transformer
+        n_tasks = len(ECM) * (FOLDS + 1) + 2
+        assert len(ens.profile_) == n_tasks
+        assert set(r['job'] for r in ens.profile_) == {'fit'}
+        assert all(r['duration'] >= 0 and r['pid'] for r in ens.profile_)
+
+        columns = ens.profile_.columns()
+        assert len(columns['task']) == n_tasks
+        assert ('layer-2', (None, 'ols')) in zip(columns['layer'],
+                                                 columns['task'])
+
+        table = ens.profile_.table(n=3).split('\n')
+        assert len(table) == 4
+        assert table[0].split()[:4] == ['layer', 'job', 'task', 'func']
+
+        ens.predict(X1)
+        layer = ens.layers.layers['layer-1']
+        assert len([r for r in layer.timings_ if r['job'] == 'predict']) == \
+            len(ECM)
+
+
+def test_positional_args():
+    """[SuperLearner] test positional arguments bind as before."""
+    ens = SuperLearner(2, False, None, None, True, 2, False, 1, 'threading',
+                       None, True)
+    assert ens.layers is None
+    assert ens.backend == 'threading'
+    assert ens.scheduler is True
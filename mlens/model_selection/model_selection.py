@@ -102,6 +102,19 @@ class Evaluator(object):
     verbose : bool or int (default = False)
         level of printed messages.
 
+    memory : str or None (default = None)
+        directory of a fit cache to write models fitted on folds to. An
+        ensemble fitted on the same data and folds with the same ``memory``
+        loads these instead of refitting its base learners. See the
+        ``memory`` parameter of :class:`mlens.ensemble.SuperLearner`.
+
+    halving : int or None (default = None)
+        reduction factor for a successive halving search. If set, parameter
+        draws are first evaluated on a few folds, and only the best
+        ``1 / halving`` of the draws for each estimator are evaluated on
+        more folds, until the last draws are evaluated on all folds. Only
+        draws evaluated on all folds are considered in the ``summary``.
+
     Attributes
     ----------
     summary : dict
@@ -123,7 +136,9 @@ class Evaluator(object):
                  error_score=None,
                  metrics=None,
                  n_jobs=-1,
-                 verbose=False):
+                 verbose=False,
+                 memory=None,
+                 halving=None):
 
         self.cv = cv
         self.indexer = FoldIndex(cv)
@@ -134,6 +149,8 @@ class Evaluator(object):
         self.metrics = [np.mean, np.std] if metrics is None else metrics
         self.random_state = random_state
         self.verbose = verbose
+        self.memory = memory
+        self.halving = halving
 
         _check_scorer(scorer)
         self.scorer = scorer
@@ -482,6 +499,28 @@ class Evaluator(object):
                 for est_name, _ in self.estimators:
                     self._set_params(param_dicts, (None, est_name))
 
+    def _fold_schedule(self):
+        """Folds to evaluate draws on in each round of a search.
+
+        In a successive halving search, one round is run for each
+        ``halving``-fold reduction of the number of draws, with at most one
+        round per fold. The number of folds grows by ``halving`` each round.
+        """
+        n = self.indexer.n_splits
+        if not self.halving:
+            return [list(range(n))]
+
+        n_rounds = min(n, 1 + int(np.log(self.n_iter) /
+                                  np.log(self.halving) + 1e-9))
+
+        rounds, start = list(), 0
+        for r in range(n_rounds):
+            stop = int(np.ceil(n * self.halving ** (r + 1 - n_rounds)))
+            stop = max(start + 1, min(stop, n - n_rounds + r + 1))
+            rounds.append(list(range(start, stop)))
+            start = stop
+        return rounds
+
     def _collect(self):
         """Collect output and format into dicts."""
         # Scores are returned as a list of tuples for each case, est, draw and
@@ -493,7 +532,7 @@ class Evaluator(object):
         cv_res = self._get_results(scores)
 
         # Summarize best draws for each case-est draw
-        summary = self._summarize(cv_res)
+        summary = self._summarize(cv_res, scores)
 
         # Finally, we sort summary in order of best performance
         rank = sorted(summary['test_score_mean'],
@@ -509,15 +548,23 @@ class Evaluator(object):
         self.cv_results = cv_res
         self.summary = pretty_summary
 
-    def _summarize(self, cv_res):
-        """For each case-estimator, return best param draw from cv results."""
+    def _summarize(self, cv_res, scores):
+        """For each case-estimator, return best param draw from cv results.
+
+        Only draws evaluated on the most folds are considered.
+        """
         summary = _dict()
         for case_est, data in cv_res.items():
+            n_folds = {draw_num: len(draw['test_score'])
+                       for draw_num, draw in scores[case_est].items()}
+            max_folds = max(n_folds.values())
 
             # For each case and estimator, iterate over draws to find best
             # test score
             best_data = None
             for draw_num, draw_data in data.items():
+                if n_folds[draw_num] < max_folds:
+                    continue
 
                 if best_data is None:
                     best_data, best_draw = draw_data, draw_num
@@ -553,12 +600,7 @@ class Evaluator(object):
         """Aggregate scores to one list per case, est and param draw level."""
         scores = _dict()
         for case, est, draw_num, train_sc, test_sc, fit_time in self.scores_:
-
-            # Strip fold data
-            if case is not None:
-                name = (case.split('__')[0], est.split('__')[0])
-            else:
-                name = est.split('__')[0]
+            name = (case, est) if case is not None else est
 
             if name not in scores:
                 scores[name] = _dict()
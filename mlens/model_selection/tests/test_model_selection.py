@@ -3,7 +3,11 @@
 Test model selection.
 """
 import os
+import shutil
+import tempfile
+import warnings
 import numpy as np
+from mlens.ensemble import SuperLearner
 from mlens.model_selection import Evaluator
 from mlens.metrics import mape, make_scorer
 from mlens.utils.exceptions import FitFailedWarning
@@ -25,6 +29,16 @@ def failed_score(p, y):
     """Bad scoring function to test exception handling."""
     raise ValueError("This fails.")
 
+
+class OddOLS(OLS):
+
+    """OLS that fails to fit with odd offsets."""
+
+    def fit(self, X, y):
+        if self.offset % 2:
+            raise ValueError("This fails.")
+        return super(OddOLS, self).fit(X, y)
+
 mape_scorer = make_scorer(mape, greater_is_better=False)
 bad_scorer = make_scorer(failed_score)
 
@@ -159,3 +173,88 @@ def test_w_prep_set_params():
 
     assert evl.summary['params'][('no', 'ols')]['offset'] == 3
     assert evl.summary['params'][('pr', 'ols')]['offset'] == 1
+
+
+def test_memory():
+    """[Model Selection] Test ensembles reuse fold fits through 'memory'."""
+    memory = tempfile.mkdtemp()
+    try:
+        evl = Evaluator(mape_scorer, cv=5, shuffle=False, random_state=100,
+                        memory=memory)
+        evl.fit(X, y,
+                estimators=[OLS()],
+                param_dicts={'ols': {'offset': randint(1, 10)}},
+                preprocessing={'pr': [Scale()], 'no': []},
+                n_iter=3)
+        n_cached = len(os.listdir(memory))
+
+        best = evl.summary['params']
+        estimators = {case: [OLS(**best[case, 'ols'])]
+                      for case in ['pr', 'no']}
+        preprocessing = {'pr': [Scale()], 'no': []}
+
+        ens = SuperLearner(folds=5, memory=memory)
+        ens.add(estimators, preprocessing)
+        ens.add_meta(OLS())
+        ens.fit(X, y)
+
+        # Only full-data fits and the meta layer are new
+        assert len(os.listdir(memory)) == n_cached + 6
+
+        ref = SuperLearner(folds=5)
+        ref.add(estimators, preprocessing)
+        ref.add_meta(OLS())
+        ref.fit(X, y)
+        np.testing.assert_array_equal(ens.predict(X), ref.predict(X))
+    finally:
+        shutil.rmtree(memory)
+
+
+def test_halving():
+    """[Model Selection] Test successive halving search."""
+    evl = Evaluator(mape_scorer, cv=4, shuffle=False, random_state=100,
+                    halving=2)
+    evl.fit(X, y,
+            estimators=[OLS()],
+            param_dicts={'ols': {'offset': randint(1, 10)}},
+            n_iter=8)
+
+    assert evl._fold_schedule() == [[0], [1], [2], [3]]
+    assert len(evl.scores_) == 8 + 4 + 2 + 1
+
+    # The winner is the only draw evaluated on all folds
+    best = [draw for draw, data in evl.cv_results['ols'].items()
+            if data['test_score_mean'] ==
+            evl.summary['test_score_mean']['ols']]
+    assert len([s for s in evl.scores_ if s[2] == best[0]]) == 4
+
+    evl.n_iter, evl.indexer.n_splits = 200, 10
+    assert [len(f) for f in evl._fold_schedule()] == [1, 1, 1, 1, 1, 1, 1,
+                                                      3]
+
+
+def test_halving_error_score():
+    """[Model Selection] Test successive halving ranks failed draws last."""
+    evl = Evaluator(mape_scorer, cv=4, shuffle=False, random_state=100,
+                    halving=2, error_score=np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FitFailedWarning)
+        evl.fit(X, y,
+                estimators=[('ols', OddOLS())],
+                param_dicts={'ols': {'offset': randint(1, 10)}},
+                n_iter=8)
+
+    n_folds, failed = dict(), set()
+    for _, _, draw, _, test_score, _ in evl.scores_:
+        n_folds[draw] = n_folds.get(draw, 0) + 1
+        if np.isnan(test_score):
+            failed.add(draw)
+    assert 0 < len(failed) < 8
+
+    # Failed draws are only kept if too few draws succeeded
+    for r, n_keep in enumerate([8, 4, 2, 1]):
+        kept = [draw for draw, n in n_folds.items() if n > r]
+        assert len(kept) == n_keep
+        assert len(set(kept) - failed) == min(n_keep, 8 - len(failed))
+
+    assert np.isfinite(evl.summary['test_score_mean']['ols'])
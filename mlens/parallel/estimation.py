@@ -9,26 +9,35 @@ Base class for estimation.
 
 import os
 from abc import ABCMeta, abstractmethod
-from time import sleep
+from collections import OrderedDict
+from time import sleep, time as wall_time
 
 import numpy as np
+from scipy.sparse import issparse, vstack as sparse_vstack
 
-from ..externals.joblib import delayed
-from ..externals.joblib.parallel import SafeFunction
-
-from ..utils import (check_is_fitted,
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .profile import Profile, add_event, profiled
+from .scheduler import Scheduler
+from .store import (FoldStore, _LOAD_ERRORS, cache_path,
+                    fingerprint as data_fingerprint, fit_key, load_cached,
+                    save_cached, trans_key)
+from ..externals.joblib import delayed, dump, load
+from ..externals.sklearn.base import clone
+
+from ..utils import (annotate,
+                     check_is_fitted,
                      pickle_load,
                      pickle_save,
                      print_time,
                      safe_print)
 
-from ..utils.exceptions import (FitFailedError,
-                                FitFailedWarning,
-                                NotFittedError,
+from ..utils.exceptions import (NotFittedError,
                                 ParallelProcessingError,
-                                ParallelProcessingWarning,
-                                PredictFailedError,
-                                PredictFailedWarning)
+                                ParallelProcessingWarning)
 
 try:
     from time import perf_counter as time_
@@ -37,6 +46,23 @@ except ImportError:
 
 import warnings
 
+# Arrays of fitted instances larger than this are cached as raw .npy files
+CACHE_NBYTES = int(1e6)
+
+# Fitted estimators with arrays larger than this are passed from worker
+# processes through the cache rather than returned
+RETURN_NBYTES = int(1e8)
+
+# Task record describing an estimator in the estimator list of an engine,
+# see _describe
+TASK_DTYPE = np.dtype([('entry', np.int32),
+                       ('main', np.int32),
+                       ('case', np.int32),
+                       ('partition', np.int32),
+                       ('fold', np.int32),
+                       ('est', np.int32),
+                       ('col', np.int32)])
+
 
 class BaseEstimator(object):
 
@@ -47,10 +73,18 @@ class BaseEstimator(object):
 
     A subclass must implement a ``_format_instance_list`` method for
     building a list of preprocessing cases and a list of estimators that
-    will be iterated over in the call to :class:`joblib.Parallel`,
-    and a ``_get_col_id`` method for assigning a unique column and if
-    applicable, row slice, to each estimator in the estimator list.
-    The subclass ``__init__`` method should be a call to ``super``.
+    will be iterated over in the call to :class:`joblib.Parallel`. The
+    estimator list holds main entries first, followed by one block of fold
+    entries per main entry (see :func:`_describe`). Each estimator is
+    described by a task record in ``self.d``, which assigns it a unique
+    column. The subclass ``__init__`` method should be a call to ``super``.
+
+    Estimators that define a ``fit_folds(X, y, folds)`` method are fitted
+    on all folds of a preprocessing-free case in a single task. ``folds`` is
+    a list of ``(train, test)`` tuples of ``(start, stop)`` row ranges, and
+    the method should return one fitted estimator per fold. This lets
+    estimators share work across folds, e.g. sufficient statistics computed
+    once on the full data.
 
     Parameters
     ----------
@@ -60,15 +94,31 @@ class BaseEstimator(object):
     dual : bool
         whether to estimate transformers separately from estimators: else,
         the lists will be combined in one parallel for-loop.
+
+    scheduler : bool
+        whether to dispatch the estimators of a preprocessing case as soon as
+        the case's transformers are fitted. Overrides ``dual``. Avoids both
+        the barrier between transformers and estimators of ``dual=True`` and
+        the waiting on transformers in the cache of ``dual=False``.
+
+    copy : bool
+        whether to copy slices of the input into memory. If ``False``,
+        estimators fitted on a contiguous range of rows get a read-only view
+        of the cache instead. Use with estimators that do not modify their
+        input in place.
     """
 
     __metaclass__ = ABCMeta
 
     __slots__ = ['verbose', 'layer', 'raise_', 'name', 'classes', 'proba',
-                 'ivals', 'dual', 'e', 't', 'c', 'scorer']
+                 'ivals', 'dual', 'scheduler', 'copy', 'e', 't', 'd', 'c',
+                 'scorer']
+
+    # Estimators to reproduce the predictions of the fit call with
+    _transform_estimators = 'fold'
 
     @abstractmethod
-    def __init__(self, layer, dual=True):
+    def __init__(self, layer, dual=True, scheduler=False, copy=True):
         self.layer = layer
 
         # Copy some layer parameters to ease notation
@@ -79,58 +129,92 @@ class BaseEstimator(object):
         self.scorer = self.layer.scorer
         self.ivals = (getattr(layer, 'ival', 0.1), getattr(layer, 'lim', 600))
 
-        # Set estimator and transformer lists to loop over, and collect
-        # estimator column ids for the prediction matrix
+        # Set estimator and transformer lists to loop over, describe each
+        # estimator and collect column ids for the prediction matrix
         self.e, self.t = self._format_instance_list()
+        self.d = self._get_descriptors()
         self.c = self._get_col_id()
 
         self.dual = dual
-
+        self.scheduler = scheduler
+        self.copy = copy
 
     @abstractmethod
     def _format_instance_list(self):
         """Formatting layer's estimator and preprocessing for parallel loop."""
 
-    @abstractmethod
+    def _get_descriptors(self):
+        """Describe every estimator by a task record."""
+        n_partitions = getattr(self.layer.indexer, 'n_partitions', 1)
+        return _describe(self.e,
+                         len(self.layer.cases) * n_partitions,
+                         n_partitions,
+                         getattr(self.layer, 'classes_', 1))
+
     def _get_col_id(self):
         """Assign unique col_id to every estimator."""
+        return _col_idx(self.e, self.d)
+
+    def _assemble(self, dir, fitted=None):
+        """Store fitted transformer and estimators in the layer.
+
+        ``fitted`` maps task names to the return values of the fit tasks.
+        Estimators not returned by their task are loaded from the cache.
+        """
+        if fitted is not None:
+            # Tasks that fit all folds of an estimator return a mapping
+            expanded = dict()
+            for name, out in fitted.items():
+                if isinstance(out, dict):
+                    expanded.update(out)
+                else:
+                    expanded[name] = out
+
+            fitted = {name[1:]: out for name, out in expanded.items()
+                      if name[0] == self.name and out is not None}
 
-    def _assemble(self, dir):
-        """Store fitted transformer and estimators in the layer."""
         self.layer.preprocessing_ = _assemble(dir, self.t, 't')
-        self.layer.estimators_, s = _assemble(dir, self.e, 'e')
+        self.layer.estimators_, s = _assemble(dir, self.e, 'e', fitted)
+
+        store = getattr(self.layer, 'fold_store', None)
+        if store is not None:
+            # Keep fold estimators on disk until transform needs them
+            n_pred = self.layer.n_pred
+            self.layer.fold_estimators_ = FoldStore(
+                os.path.join(store, self.name),
+                self.layer.estimators_[n_pred:],
+                self.layer.fold_cache)
+            self.layer.estimators_ = self.layer.estimators_[:n_pred]
+        elif hasattr(self.layer, 'fold_estimators_'):
+            del self.layer.fold_estimators_
 
         if self.scorer is not None and self.layer.cls is not 'full':
             self.layer.scores_ = self._build_scores(s)
 
     def _build_scores(self, s):
-        """Build a cv-score mapping."""
-        scores = dict()
-
-        # Build shell dictionary with main estimators as keys
-        for k, v in s[:self.layer.n_pred]:
-            case_name, est_name = k.split('___')
-
-            if case_name == '':
-                name = est_name
-            else:
-                name = '%s__%s' % (case_name, est_name)
-
-            scores[name] = []
-
-        # Populate with list of scores from folds
-        for k, v in s[self.layer.n_pred:]:
-            case_name, est_name = k.split('___')
-
-            est_name = '__'.join(est_name.split('__')[:-1])
-
-            if '__' not in case_name:
-                name = est_name
-            else:
-                case_name = case_name.split('__')[0]
-                name = '%s__%s' % (case_name, est_name)
-
-            scores[name].append(v)
+        """Build a cv-score mapping.
+
+        ``s`` lists the score of every estimator, in the order of the
+        estimator list. Scores of estimators with a test set are aggregated
+        onto their main estimator.
+        """
+        scores, names = dict(), dict()
+        for (entry, main, est, fold), (_, v) in zip(
+                self.d[['entry', 'main', 'est', 'fold']].tolist(), s):
+            case, _, tei, est_list = self.e[entry]
+            if fold < 0:
+                # Main estimator: build shell entry
+                name = est_list[est][0]
+                if case is not None:
+                    name = '%s__%s' % (case, name)
+
+                names[main, est] = name
+                scores[name] = []
+
+            if tei is not None:
+                # Populate with list of scores from folds, or from the
+                # holdout set of blended estimators
+                scores[names[main, est]].append(v)
 
         # Aggregate to get cross-validated mean scores
         for k, v in scores.items():
@@ -138,78 +222,87 @@ class BaseEstimator(object):
 
         return scores
 
-    def fit(self, X, y, P, dir, parallel):
-        """Fit layer through given attribute."""
+    def fit(self, X, y, P, dir, parallel, return_fitted=True,
+            warm_start=False, memory=None):
+        """Fit layer through given attribute.
+
+        If ``return_fitted`` is ``True``, fitted estimators are collected from
+        the return values of the fit tasks. Otherwise, and for estimators too
+        large to send back from a worker process, they are read back from the
+        cache.
+
+        If ``warm_start`` is ``True``, estimators fitted in the previous call
+        on the same data, with the same parameters, preprocessing and folds,
+        are kept and their predictions reused. Only new or changed estimators
+        are fitted.
+
+        If ``memory`` is a directory, fitted transformers and estimators are
+        cached in it, keyed on a hash of the data, the folds and the
+        parameters of the estimator and its preprocessing. Cached entries are
+        loaded rather than fitted, also across ensembles and sessions.
+        """
         if self.verbose:
             printout = "stderr" if self.verbose < 50 else "stdout"
             safe_print('Fitting %s' % self.name, file=printout)
             t0 = time_()
 
-        pred_method = 'predict' if not self.proba else 'predict_proba'
-        preprocess = self.t is not None
+        annotate('%s fit' % self.name)
 
-        if y.shape[0] > X.shape[0]:
-            # This is legal if X is a prediction matrix generated by predicting
-            # only a subset of the original training set.
-            # Since indexing is strictly monotonic, we can simply discard
-            # the first observations y to get the corresponding labels.
-            rebase = y.shape[0] - X.shape[0]
-            y = y[rebase:]
+        if warm_start or memory is not None:
+            if y.shape[0] > X.shape[0]:
+                y = y[y.shape[0] - X.shape[0]:]
 
-        if self.dual:
-            if preprocess:
-                parallel(delayed(fit_trans)(dir=dir,
-                                            case=case,
-                                            inst=instance_list,
-                                            X=X,
-                                            y=y,
-                                            idx=tri,
-                                            name=self.name)
-                         for case, tri, _, instance_list in self.t)
-
-            parallel(delayed(fit_est)(dir=dir,
-                                      case=case,
-                                      inst_name=inst_name,
-                                      inst=instance,
-                                      X=X,
-                                      y=y,
-                                      pred=P if tei is not None else None,
-                                      idx=(tri, tei, self.c[case, inst_name]),
-                                      name=self.name,
-                                      raise_on_exception=self.raise_,
-                                      preprocess=preprocess,
-                                      ivals=self.ivals,
-                                      attr=pred_method,
-                                      scorer=self.scorer)
-                     for case, tri, tei, instance_list in self.e
-                     for inst_name, instance in instance_list)
+            fingerprint = data_fingerprint(X, y)
+            signatures = self._signatures()
+
+        cache = None
+        if memory is not None:
+            cache = self._cache_paths(memory, fingerprint, signatures)
 
+        if warm_start:
+            reused = self._reuse(X, y, P, fingerprint, signatures)
+
+            state = self.layer.fit_state_ if reused else None
+            if state is not None and state['signatures'] == signatures:
+                # Nothing has changed: the layer is already fitted
+                P[:] = state['preds']
+                if self.verbose:
+                    print_time(t0, '%s Done' % self.name, file=printout)
+                return
         else:
-            parallel(delayed(_fit)(dir=dir,
-                                   case=case,
-                                   inst_name=inst_name,
-                                   inst=instance,
-                                   X=X,
-                                   y=y,
-                                   pred=P if tei is not None else None,
-                                   idx=(tri, tei, self.c[case, inst_name])
-                                   if inst_name != '__trans__' else tri,
-                                   name=self.layer.name,
-                                   raise_on_exception=self.raise_,
-                                   preprocess=preprocess,
-                                   ivals=self.ivals,
-                                   scorer=self.scorer)
-                     for case, tri, tei, inst_list in _wrap(self.t) + self.e
-                     for inst_name, instance in inst_list)
+            reused = dict()
 
-        # Load instances from cache and store as layer attributes
-        # Typically, as layer.estimators_, layer.preprocessing_
-        self._assemble(dir)
+        nbytes = _return_nbytes(parallel) if return_fitted else None
+        tasks = [task for task in self._fit_tasks(X, y, P, dir, nbytes, cache)
+                 if task[0] not in reused]
+
+        if self.dual:
+            batches = ([task for task in tasks if task[1] is fit_trans],
+                       [task for task in tasks if task[1] is not fit_trans])
+        else:
+            # Transformers are listed first, so estimators will find them
+            # in the cache as soon as possible
+            batches = (tasks,)
+
+        results = self._run_tasks(parallel, tasks, batches)
+        fitted = self._record('fit', tasks, results, X)
+
+        # Store instances as layer attributes, typically as
+        # layer.estimators_, layer.preprocessing_
+        fitted.update(reused)
+        self._assemble(dir, fitted)
+
+        # Training predictions are only kept if needed for the next fit
+        self.layer.fit_state_ = None
+        if warm_start:
+            self.layer.fit_state_ = {'fingerprint': fingerprint,
+                                     'signatures': signatures,
+                                     'preds': np.array(P)}
 
         if self.verbose:
             print_time(t0, '%s Done' % self.name, file=printout)
 
-    def predict(self, X, P, parallel):
+    def predict(self, X, P, parallel, dir=None):
         """Predict with fitted layer with either full or fold ests."""
         self._check_fitted()
 
@@ -218,27 +311,15 @@ class BaseEstimator(object):
             safe_print('Predicting %s' % self.name, file=printout)
             t0 = time_()
 
-        pred_method = 'predict' if not self.proba else 'predict_proba'
+        annotate('%s predict' % self.name)
 
-        # Collect estimators, either fitted on full data or folds
-        prep, ests = self._retrieve('full')
-
-        parallel(delayed(predict_est)(case=case,
-                                      tr_list=prep[case]
-                                      if prep is not None else [],
-                                      inst_name=inst_name,
-                                      est=est,
-                                      xtest=X,
-                                      pred=P,
-                                      col=col,
-                                      name=self.name,
-                                      attr=pred_method)
-                 for case, (inst_name, est, (_, col)) in ests)
+        tasks = self._predict_tasks(X, P, dir)
+        self._record('predict', tasks, self._run_tasks(parallel, tasks), X)
 
         if self.verbose:
             print_time(t0, '%s Done' % self.name, file=printout)
 
-    def transform(self, X, P, parallel):
+    def transform(self, X, P, parallel, dir=None):
         """Transform training data with fold-estimators from fit call."""
         self._check_fitted()
 
@@ -247,26 +328,372 @@ class BaseEstimator(object):
             safe_print('Transforming %s' % self.name, file=printout)
             t0 = time_()
 
-        pred_method = 'predict' if not self.proba else 'predict_proba'
+        annotate('%s transform' % self.name)
 
-        # Collect estimators, either fitted on full data or folds
-        prep, ests = self._retrieve('fold')
-
-        parallel(delayed(predict_fold_est)(case=case,
-                                           tr_list=prep[case]
-                                           if prep is not None else [],
-                                           inst_name=est_name,
-                                           est=est,
-                                           xtest=X,
-                                           pred=P,
-                                           idx=idx,
-                                           name=self.name,
-                                           attr=pred_method)
-                 for case, (est_name, est, idx) in ests)
+        tasks = self._transform_tasks(X, P, dir)
+        self._record('transform', tasks, self._run_tasks(parallel, tasks), X)
 
         if self.verbose:
             print_time(t0, '%s Done' % self.name, file=printout)
 
+    def _signatures(self):
+        """Hash each estimator with its preprocessing and folds."""
+        signatures = dict()
+        for i, (case, tri, tei, instance_list) in enumerate(self.e):
+            tr = self.t[i][3] if self.t is not None else None
+            for inst_name, instance in instance_list:
+                signatures[case, inst_name] = fit_key(tri, tei, tr, instance)
+        return signatures
+
+    def _cache_paths(self, memory, fingerprint, signatures):
+        """Map fit task names to entries in the fit cache in ``memory``."""
+        if not os.path.exists(memory):
+            os.makedirs(memory)
+
+        paths = {(self.name,) + key: cache_path(memory, fingerprint, signature)
+                 for key, signature in signatures.items()}
+
+        if self.t is not None:
+            for i, (_, tri, _, instance_list) in enumerate(self.t):
+                paths[self.name, i, '__trans__'] = cache_path(
+                    memory, fingerprint, trans_key(tri, instance_list))
+        return paths
+
+    def _reuse(self, X, y, P, fingerprint, signatures):
+        """Collect estimators from the previous fit that are still valid.
+
+        Predictions of reused estimators are copied to their new columns in
+        ``P``. Returns a mapping of fit task names to fit task return values.
+        """
+        state = getattr(self.layer, 'fit_state_', None)
+        if state is None or state['fingerprint'] != fingerprint:
+            return dict()
+
+        old = self.layer.estimators_
+        if getattr(self.layer, 'fold_estimators_', None) is not None:
+            old = old + self.layer.fold_estimators_[:]
+        old = {(case, tup[0]): tup for case, tup in old}
+
+        n = X.shape[0]
+        rebase = n - P.shape[0]
+        width = getattr(self.layer, 'classes_', 1) if self.proba else 1
+
+        reused = dict()
+        for key, signature in signatures.items():
+            if state['signatures'].get(key) != signature or key not in old:
+                continue
+
+            case, inst_name = key
+            _, inst, (tei, col) = old[key]
+            s = None
+            if tei is not None:
+                rows = _rows(tei, n, rebase)
+                p = _concat([state['preds'][a:b, col:col + width]
+                             for a, b in rows])
+                if width == 1:
+                    p = p.ravel()
+                _write(P, rows, self.c[key], p)
+
+                if self.scorer is not None:
+                    z = _concat([y[a:b] for a, b in _rows(tei, n)])
+                    try:
+                        s = self.scorer(z, p)
+                    except Exception:
+                        s = None
+
+            reused[self.name, case, inst_name] = \
+                (inst_name, inst, (tei, self.c[key]), s)
+        return reused
+
+    def _run_tasks(self, parallel, tasks, batches=None):
+        """Run tasks and measure them.
+
+        If the engine does not use a scheduler, ``batches`` of tasks are run
+        one after the other. Defaults to tasks without dependencies followed
+        by tasks with dependencies. Returns a mapping of task names to the
+        output of :func:`mlens.parallel.profile.profiled`.
+        """
+        if self.scheduler:
+            schedule = Scheduler(parallel)
+            for name, func, kwargs, deps, _, _ in tasks:
+                schedule.add(name, profiled, dict(func=func, kwargs=kwargs),
+                             deps)
+            return schedule.run()
+
+        if batches is None:
+            batches = ([task for task in tasks if not task[3]],
+                       [task for task in tasks if task[3]])
+
+        results = dict()
+        for batch in batches:
+            if batch:
+                out = parallel(delayed(profiled)(func, kwargs)
+                               for _, func, kwargs, _, _, _ in batch)
+                results.update(zip([task[0] for task in batch], out))
+        return results
+
+    def _record(self, job, tasks, results, X):
+        """Store measurements of tasks in ``layer.timings_``.
+
+        Records of previous calls with the same ``job`` are replaced. Returns
+        a mapping of task names to task outputs.
+        """
+        row_nbytes = _row_nbytes(X)
+
+        out, records = dict(), list()
+        for name, func, _, _, reads, _ in tasks:
+            if name not in results:
+                # Task of another layer
+                continue
+
+            out[name], (pid, tid, start, duration, rss, events) = \
+                results[name]
+            records.append({'layer': self.name,
+                            'job': job,
+                            'task': name[1:],
+                            'func': func.__name__,
+                            'pid': pid,
+                            'tid': tid,
+                            'start': start,
+                            'duration': duration,
+                            'nbytes': row_nbytes * sum(
+                                [b - a for a, b in reads]),
+                            'rss': rss,
+                            'events': events})
+
+        timings = getattr(self.layer, 'timings_', None) or list()
+        self.layer.timings_ = Profile(
+            [r for r in timings if r['job'] != job] + records)
+        return out
+
+    def _fit_tasks(self, X, y, P, dir, return_nbytes=None, cache=None):
+        """Build the list of tasks for fitting the layer.
+
+        Each task is a tuple ``(name, func, kwargs, deps, reads, writes)``,
+        where ``deps`` are names of tasks in the layer that must complete
+        before the task can run, and ``reads`` and ``writes`` are the row
+        ranges the task reads from ``X`` and writes to ``P``. Transformer
+        tasks are listed before estimator tasks.
+
+        Estimator tasks return fitted estimators with arrays of at most
+        ``return_nbytes`` bytes, and write the rest to the cache. If
+        ``None``, all estimators are written to the cache. ``cache`` maps
+        task names to entries in a persistent fit cache.
+        """
+        if cache is None:
+            cache = dict()
+
+        pred_method = 'predict' if not self.proba else 'predict_proba'
+        preprocess = self.t is not None
+
+        if y.shape[0] > X.shape[0]:
+            # This is legal if X is a prediction matrix generated by predicting
+            # only a subset of the original training set.
+            # Since indexing is strictly monotonic, we can simply discard
+            # the first observations y to get the corresponding labels.
+            rebase = y.shape[0] - X.shape[0]
+            y = y[rebase:]
+
+        n = X.shape[0]
+        rebase = n - P.shape[0]
+
+        tasks = list()
+        if preprocess:
+            # The transformer list is aligned with the estimator list, so
+            # transformers are named and cached by position: case names need
+            # not be unique across folds.
+            for i, (case, tri, _, instance_list) in enumerate(self.t):
+                tasks.append(((self.name, i, '__trans__'),
+                              fit_trans,
+                              dict(dir=dir,
+                                   case=case,
+                                   key=i,
+                                   inst=instance_list,
+                                   X=X,
+                                   y=y,
+                                   idx=tri,
+                                   name=self.name,
+                                   copy=self.copy,
+                                   cache=cache.get((self.name, i,
+                                                    '__trans__'))),
+                              [],
+                              _rows(tri, n),
+                              []))
+
+        # Task record of the first estimator of each entry
+        first = np.searchsorted(self.d['entry'], np.arange(len(self.e)))
+
+        batches = OrderedDict()
+        for i, (case, tri, tei, instance_list) in enumerate(self.e):
+            deps = [(self.name, i, '__trans__')] if preprocess else []
+            reads = _rows(tri, n)
+            writes = []
+            if tei is not None:
+                reads += _rows(tei, n)
+                writes = _rows(tei, n, rebase)
+
+            for j, (inst_name, instance) in enumerate(instance_list):
+                if (tei is not None and hasattr(instance, 'fit_folds') and
+                        not (preprocess and self.t[i][3])):
+                    # Fit all folds of the estimator in one task
+                    main = self.d['main'][first[i] + j]
+                    batches.setdefault((self.e[main][0], j), []).append(
+                        (case, inst_name, instance, tri, tei))
+                    continue
+
+                tasks.append(((self.name, case, inst_name),
+                              fit_est,
+                              dict(dir=dir,
+                                   case=case,
+                                   inst_name=inst_name,
+                                   inst=instance,
+                                   X=X,
+                                   y=y,
+                                   pred=P if tei is not None else None,
+                                   idx=(tri, tei, self.c[case, inst_name]),
+                                   name=self.name,
+                                   raise_on_exception=self.raise_,
+                                   preprocess=preprocess,
+                                   ivals=self.ivals,
+                                   attr=pred_method,
+                                   scorer=self.scorer,
+                                   key=i,
+                                   copy=self.copy,
+                                   return_nbytes=return_nbytes,
+                                   cache=cache.get((self.name, case,
+                                                    inst_name))),
+                              deps,
+                              reads,
+                              writes))
+
+        for (base, j), entries in batches.items():
+            tasks.append(((self.name, base, j, '__folds__'),
+                          fit_est_folds,
+                          dict(dir=dir,
+                               entries=[(case, inst_name, tri, tei,
+                                         self.c[case, inst_name])
+                                        for case, inst_name, _, tri, tei
+                                        in entries],
+                               inst=entries[0][2],
+                               X=X,
+                               y=y,
+                               pred=P,
+                               name=self.name,
+                               attr=pred_method,
+                               scorer=self.scorer,
+                               copy=self.copy,
+                               return_nbytes=return_nbytes),
+                          [],
+                          [(0, n)],
+                          [w for entry in entries
+                           for w in _rows(entry[4], n, rebase)]))
+        return tasks
+
+    def _predict_tasks(self, X, P, dir=None):
+        """Build the list of tasks for predicting with the layer.
+
+        See :meth:`_fit_tasks` for the task format and
+        :meth:`_prediction_tasks` for how estimators share inputs.
+        """
+        return self._prediction_tasks(X, P, dir, 'full', False)
+
+    def _transform_tasks(self, X, P, dir=None):
+        """Build the list of tasks for reproducing predictions from fit.
+
+        See :meth:`_predict_tasks`.
+        """
+        return self._prediction_tasks(X, P, dir, self._transform_estimators,
+                                      True)
+
+    def _prediction_tasks(self, X, P, dir, s, fold):
+        """Build prediction tasks that transform each case once.
+
+        Estimators are grouped on preprocessing case and, if ``fold``, on the
+        test fold they predict. If a group has preprocessing and more than one
+        estimator, a task transforms the input once into a
+        :class:`SharedInput` and the group's estimators depend on it. Other
+        estimators transform their own input.
+
+        Parameters
+        ----------
+        X, P : array-like
+            input and prediction arrays.
+
+        dir : str or None
+            directory to dump shared inputs to. If ``None``, shared inputs are
+            kept in memory and tasks must run in the same process.
+
+        s : str
+            estimators to predict with, either ``'full'`` or ``'fold'``.
+
+        fold : bool
+            whether estimators predict their test fold rather than all of
+            ``X``.
+        """
+        pred_method = 'predict' if not self.proba else 'predict_proba'
+
+        # Collect estimators, either fitted on full data or folds
+        prep, ests = self._retrieve(s)
+
+        n = X.shape[0]
+        rebase = n - P.shape[0]
+        cache = dir if dir is not None else dict()
+
+        groups = OrderedDict()
+        for case, (inst_name, est, idx) in ests:
+            tei = idx[0] if fold else None
+            key = (case, tuple(_rows(tei, n)))
+            groups.setdefault(key, (case, tei, list()))[2].append(
+                (inst_name, est, idx))
+
+        tasks = list()
+        for i, (case, tei, group) in enumerate(groups.values()):
+            tr_list = prep[case] if prep is not None else []
+            reads, writes = _rows(tei, n), _rows(tei, n, rebase)
+
+            shared, deps = None, []
+            if tr_list and len(group) > 1:
+                shared = SharedInput(cache, '%s__%i__x' % (self.name, i))
+                deps = [(self.name, i, '__shared__')]
+                tasks.append((deps[0],
+                              transform_case,
+                              dict(shared=shared,
+                                   tr_list=tr_list,
+                                   xtest=X,
+                                   idx=tei,
+                                   name=self.name,
+                                   copy=self.copy),
+                              [],
+                              reads,
+                              []))
+
+            for inst_name, est, idx in group:
+                kwargs = dict(inst_name=inst_name,
+                              est=est,
+                              pred=P,
+                              name=self.name,
+                              attr=pred_method)
+
+                if shared is not None:
+                    func = predict_shared_est
+                    kwargs.update(shared=shared, rows=writes, col=idx[1])
+                elif fold:
+                    func = predict_fold_est
+                    kwargs.update(case=case, tr_list=tr_list, xtest=X,
+                                  idx=idx, copy=self.copy)
+                else:
+                    func = predict_est
+                    kwargs.update(case=case, tr_list=tr_list, xtest=X,
+                                  col=idx[1])
+
+                tasks.append(((self.name, case, inst_name),
+                              func,
+                              kwargs,
+                              deps,
+                              reads,
+                              writes))
+        return tasks
+
     def _check_fitted(self):
         """Utility function for checking that fitted estimators exist."""
         check_is_fitted(self.layer, "estimators_")
@@ -295,8 +722,12 @@ class BaseEstimator(object):
         elif s == 'fold':
             # If fold, grab the estimators after n_pred, and the preprocessing
             # pipelines after n_prep, which are fitted on folds of the
-            # training data.
-            ests = self.layer.estimators_[n_pred:]
+            # training data. These may be kept in an on-disk store.
+            ests = getattr(self.layer, 'fold_estimators_', None)
+            if ests is None:
+                ests = self.layer.estimators_[n_pred:]
+            else:
+                ests = ests[:]
 
             if self.layer.preprocessing_ is None:
                 prep = None
@@ -311,56 +742,271 @@ class BaseEstimator(object):
 
 
 ###############################################################################
-def _wrap(folded_list, name='__trans__'):
-    """Wrap the folded transformer list.
+def _replicate(instances, n):
+    """Make ``n`` unfitted copies of a list of named instances.
 
-    wraps a folded transformer list so that the ``tr_list`` appears as
-    one estimator with a specified name. Since all ``tr_list``s have the
-    same name, it can be used to select a transformation function or an
-    estimation function in a combined parallel fitting loop.
+    Each instance is cloned once, and the clone is copied through a pickle
+    round-trip, which is several times faster than cloning every copy.
+    Instances that cannot be pickled are cloned.
+
+    Parameters
+    ----------
+    instances : list
+        ``(name, instance)`` tuples.
+
+    n : int
+        number of copies.
+
+    Returns
+    -------
+    copies : list
+        ``n`` lists of ``(name, instance)`` tuples.
+    """
+    columns = list()
+    for _, instance in instances:
+        instance = clone(instance)
+        try:
+            s = pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+            columns.append([pickle.loads(s) for _ in range(n)])
+        except (pickle.PicklingError, TypeError, AttributeError):
+            columns.append([clone(instance) for _ in range(n)])
+
+    names = [name for name, _ in instances]
+    return [[(name, column[i]) for name, column in zip(names, columns)]
+            for i in range(n)]
+
+
+def _describe(instance_list, n_main, n_partitions=1, labels=1):
+    """Describe every estimator in an instance list by a task record.
+
+    The instance list holds ``n_main`` main entries, ordered on preprocessing
+    case and then on partition, followed by fold entries in blocks of equal
+    size, one block per main entry and in the same order. Estimators of a
+    fold entry are listed in the same order as in their main entry, and share
+    their column in the prediction matrix.
+
+    Parameters
+    ----------
+    instance_list : list
+        ``(case, tri, tei, est_list)`` entries.
+
+    n_main : int
+        number of main entries.
+
+    n_partitions : int (default = 1)
+        number of partitions per preprocessing case.
+
+    labels : int (default = 1)
+        number of columns per estimator.
+
+    Returns
+    -------
+    records : array
+        structured array of dtype :obj:`TASK_DTYPE` with one record per
+        estimator, in the order of ``instance_list``. ``entry`` and ``main``
+        are the index of the estimator's entry and main entry,
+        ``case``, ``partition`` and ``fold`` locate the entry, with ``fold``
+        set to ``-1`` for main entries, ``est`` is the position of the
+        estimator in its entry, and ``col`` is its first column.
     """
-    return [(case, tri, None, [(name, instance_list)]) for
-            case, tri, tei, instance_list in folded_list]
+    if not instance_list:
+        return np.zeros(0, dtype=TASK_DTYPE)
+
+    inc = 1 if labels is None else labels
+    n_folds = max((len(instance_list) - n_main) // max(n_main, 1), 1)
+
+    sizes = np.array([len(tup[-1]) for tup in instance_list])
+    starts = np.cumsum(sizes) - sizes
+
+    entry = np.repeat(np.arange(len(instance_list)), sizes)
+    est = np.arange(entry.shape[0]) - starts[entry]
+
+    is_fold = entry >= n_main
+    main = np.where(is_fold, (entry - n_main) // n_folds, entry)
+
+    records = np.empty(entry.shape[0], dtype=TASK_DTYPE)
+    records['entry'] = entry
+    records['main'] = main
+    records['case'] = main // n_partitions
+    records['partition'] = main % n_partitions
+    records['fold'] = np.where(is_fold, (entry - n_main) % n_folds, -1)
+    records['est'] = est
+    records['col'] = (starts[main] + est) * inc
+    return records
+
 
+def _col_idx(instance_list, records):
+    """Map the ``(case, inst_name)`` of each estimator to its column."""
+    return {(instance_list[entry][0], instance_list[entry][-1][est][0]): col
+            for entry, est, col in records[['entry', 'est', 'col']].tolist()}
+
+
+###############################################################################
+def _rows(idx, n, rebase=0):
+    """Get the row ranges of an index as a list of ``(start, stop)`` tuples.
+
+    Parameters
+    ----------
+    idx : tuple or None
+        a ``(start, stop)`` tuple, a tuple of such tuples, or ``None`` for all
+        rows.
 
-def _slice_array(x, y, idx):
-    """Build training array index and slice data."""
+    n : int
+        number of rows in the indexed array.
+
+    rebase : int (default = 0)
+        offset to subtract from the ranges.
+    """
+    if idx is None:
+        ranges = [(0, n)]
+    elif isinstance(idx[0], tuple):
+        ranges = list(idx)
+    else:
+        ranges = [idx]
+
+    return [(start - rebase, stop - rebase) for start, stop in ranges]
+
+
+def _slice_array(x, y, idx, copy=True):
+    """Slice data on a range or tuple of ranges.
+
+    A range is sliced as a view and a tuple of ranges is concatenated from
+    views, so no index array is built.
+
+    Parameters
+    ----------
+    x, y : array-like
+        arrays to slice. ``y`` can be ``None``.
+
+    idx : tuple or None
+        a ``(start, stop)`` tuple, a tuple of such tuples, or ``None`` for all
+        rows.
+
+    copy : bool (default = True)
+        whether to copy a single range into memory. If ``False``, a read-only
+        view is returned, which saves memory but lets estimators keep a
+        reference to the cache.
+    """
     # Have to be careful in prepping data for estimation.
     # We need to slice memmap and convert to a proper array - otherwise
     # transformers can store results memmaped to the cache, which will
     # prevent the garbage collector from releasing the memmaps from memory
     # after estimation
     if idx is None:
-        idx = None
+        if y is not None:
+            y = np.asarray(y)
+    elif isinstance(idx[0], tuple):
+        x = _concat([x[t0:t1] for t0, t1 in idx])
+        if y is not None:
+            y = np.concatenate([y[t0:t1] for t0, t1 in idx])
     else:
-        if isinstance(idx[0], tuple):
-            # If a tuple of indices, build iteratively
-            idx = np.hstack([np.arange(t0, t1) for t0, t1 in idx])
-        else:
-            idx = np.arange(idx[0], idx[1])
-
-    x = x[idx] if idx is not None else x
-
-    if y is not None:
-        y = np.asarray(y[idx]) if idx is not None else np.asarray(y)
-
-    if x.__class__.__name__[:3] not in ['csr', 'csc', 'coo', 'dok']:
+        x = x[idx[0]:idx[1]]
+        if not issparse(x):
+            x = np.array(x) if copy else _view(x)
+        if y is not None:
+            y = y[idx[0]:idx[1]]
+            y = np.array(y) if copy else _view(y)
+
+    if not issparse(x):
         # numpy asarray does not work with scipy sparse. Current experimental
         # solution is to just leave them as is.
         x = np.asarray(x)
 
-    return x, y, idx
+    return x, y
+
+
+def _concat(arrs):
+    """Concatenate dense or sparse arrays along rows."""
+    if issparse(arrs[0]):
+        return sparse_vstack(arrs, format=arrs[0].format)
+    return np.concatenate(arrs)
+
+
+def _view(x):
+    """Return a read-only view of an array."""
+    x = np.asarray(x).view()
+    x.flags.writeable = False
+    return x
+
+
+def _write(pred, rows, col, p):
+    """Write predictions to a block of columns, one row range at a time.
+
+    Parameters
+    ----------
+    pred : array-like
+        prediction array to write to.
 
+    rows : list
+        ``(start, stop)`` row ranges in ``pred`` that the rows of ``p`` map
+        to, in order. See :func:`_rows`.
 
-def _assemble(dir, instance_list, suffix):
-    """Utility for loading fitted instances."""
+    col : int
+        first column to write to.
+
+    p : array-like
+        predictions. If 2-dimensional, ``p`` is written to as many
+        consecutive columns.
+    """
+    cols = col if len(p.shape) == 1 else slice(col, col + p.shape[1])
+
+    i = 0
+    for start, stop in rows:
+        pred[start:stop, cols] = p[i:i + stop - start]
+        i += stop - start
+
+
+def _return_nbytes(parallel):
+    """Size limit on fitted estimators returned by fit tasks."""
+    if parallel.backend == 'threading' or parallel.n_jobs == 1:
+        # Tasks run in this process: returning is free
+        return np.inf
+    return RETURN_NBYTES
+
+
+def _row_nbytes(X):
+    """Average number of bytes in a row of an array."""
+    if issparse(X):
+        nbytes = X.data.nbytes + X.indices.nbytes
+    else:
+        nbytes = getattr(X, 'nbytes', 0)
+    return nbytes // max(X.shape[0], 1)
+
+
+def _nbytes(obj, depth=3):
+    """Approximate size of the arrays held by an object."""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if issparse(obj):
+        return obj.data.nbytes
+    if depth == 0:
+        return 0
+
+    if isinstance(obj, dict):
+        vals = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        vals = obj
+    elif hasattr(obj, '__dict__'):
+        vals = vars(obj).values()
+    else:
+        return 0
+    return sum(_nbytes(v, depth - 1) for v in vals)
+
+
+def _assemble(dir, instance_list, suffix, fitted=None):
+    """Utility for loading fitted instances.
+
+    Estimators found in ``fitted``, keyed on ``(case, inst_name)``, are not
+    loaded from the cache.
+    """
     if suffix is 't':
         if instance_list is None:
             return
 
+        # Transformers are cached by position, as case names can repeat
         return [(tup[0],
-                 pickle_load(os.path.join(dir, '%s__%s' % (tup[0], suffix))))
-                for tup in instance_list]
+                 pickle_load(os.path.join(dir, '%s__%s' % (i, suffix))))
+                for i, tup in enumerate(instance_list)]
     else:
         # We iterate over estimators to split out the estimator info and the
         # scoring info (if any)
@@ -368,8 +1014,12 @@ def _assemble(dir, instance_list, suffix):
         scores_ = []
         for tup in instance_list:
             for etup in tup[-1]:
-                f = os.path.join(dir, '%s__%s__%s' % (tup[0], etup[0], suffix))
-                loaded = pickle_load(f)
+                if fitted and (tup[0], etup[0]) in fitted:
+                    loaded = fitted[tup[0], etup[0]]
+                else:
+                    f = os.path.join(dir,
+                                     '%s__%s__%s' % (tup[0], etup[0], suffix))
+                    loaded = pickle_load(f)
 
                 # split out the scores, the final element in the l tuple
                 ests_.append((tup[0], loaded[:-1]))
@@ -381,6 +1031,61 @@ def _assemble(dir, instance_list, suffix):
 
 
 ###############################################################################
+class SharedInput(object):
+
+    """Handle to an input shared by the estimators of a preprocessing case.
+
+    The input is transformed once by :func:`transform_case` and read by each
+    estimator through :func:`predict_shared_est`.
+
+    Parameters
+    ----------
+    cache : str or dict
+        directory to dump the input to, or a dictionary to store it in if all
+        tasks run in the same process.
+
+    key : str
+        name of the input in the cache.
+    """
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+
+    def set(self, x):
+        """Store the input."""
+        if isinstance(self.cache, dict):
+            self.cache[self.key] = x
+        else:
+            dump(x, os.path.join(self.cache, self.key))
+
+    def get(self):
+        """Retrieve the input."""
+        if isinstance(self.cache, dict):
+            return self.cache[self.key]
+        return load(os.path.join(self.cache, self.key), mmap_mode='r')
+
+
+def transform_case(shared, tr_list, xtest, idx, name, copy=True):
+    """Transform the input of a preprocessing case and share it."""
+    x, _ = _slice_array(xtest, None, idx, copy)
+
+    for tr_name, tr in tr_list:
+        x = tr.transform(x)
+
+    shared.set(x)
+
+
+def predict_shared_est(shared, inst_name, est, pred, rows, col, name, attr):
+    """Predict with an estimator on the shared input of its case.
+
+    ``rows`` is the list of ``(start, stop)`` row ranges in ``pred`` that the
+    rows of the shared input map to, in order.
+    """
+    p = getattr(est, attr)(shared.get())
+    _write(pred, rows, col, p)
+
+
 def predict_est(case, tr_list, inst_name, est, xtest, pred, col, name, attr):
     """Method for predicting with fitted transformers and estimators."""
     # Transform input
@@ -392,20 +1097,16 @@ def predict_est(case, tr_list, inst_name, est, xtest, pred, col, name, attr):
     # survive into the estimators_ attribute of a layer should be able to
     # predict, otherwise the subsequent layer will get corrupt input.
     p = getattr(est, attr)(xtest)
-
-    if len(p.shape) == 1:
-        pred[:, col] = p
-    else:
-        pred[:, np.arange(col, col + p.shape[1])] = p
+    _write(pred, _rows(None, pred.shape[0]), col, p)
 
 
 def predict_fold_est(case, tr_list, inst_name, est, xtest, pred, idx, name,
-                     attr):
+                     attr, copy=True):
     """Method for predicting with transformers and estimators from fit call."""
     tei = idx[0]
     col = idx[1]
 
-    x, _, tei = _slice_array(xtest, None, tei)
+    x, _ = _slice_array(xtest, None, tei, copy)
 
     for tr_name, tr in tr_list:
         x = tr.transform(x)
@@ -417,80 +1118,104 @@ def predict_fold_est(case, tr_list, inst_name, est, xtest, pred, idx, name,
     p = getattr(est, attr)(x)
 
     rebase = xtest.shape[0] - pred.shape[0]
-    tei -= rebase
+    _write(pred, _rows(tei, xtest.shape[0], rebase), col, p)
 
-    if len(p.shape) == 1:
-        pred[tei, col] = p
-    else:
-        cols = np.arange(col, col + p.shape[1])
-        pred[np.ix_(tei, cols)] = p
 
+def fit_trans(dir, case, inst, X, y, idx, name, key=None, copy=True,
+              cache=None):
+    """Fit transformers and write to cache under ``key``, or ``case``.
 
-def fit_trans(dir, case, inst, X, y, idx, name):
-    """Fit transformers and write to cache."""
-    x, y, _ = _slice_array(X, y, idx)
+    If ``cache`` is a path to an entry in a fit cache, the transformers are
+    loaded from it if it exists, and written to it if not.
+    """
+    out = load_cached(cache) if cache is not None else None
 
-    out = []
-    for tr_name, tr in inst:
-        # Fit transformer
-        tr = tr.fit(x, y)
+    if out is None:
+        x, y = _slice_array(X, y, idx, copy)
 
-        # If more than one step, transform input for next step
-        if len(inst) > 1:
-            x = tr.transform(x)
-        out.append((tr_name, tr))
+        out = []
+        for tr_name, tr in inst:
+            # Fit transformer
+            tr = tr.fit(x, y)
 
-    # Write transformer list to cache
-    f = os.path.join(dir, '%s__t' % case)
-    pickle_save(out, f)
+            # If more than one step, transform input for next step
+            if len(inst) > 1:
+                x = tr.transform(x)
+            out.append((tr_name, tr))
 
+        if cache is not None:
+            save_cached(out, cache)
 
-def fit_est(dir, case, inst_name, inst, X, y, pred, idx, raise_on_exception,
-            preprocess, name, ivals, attr, scorer=None):
-    """Fit estimator and write to cache along with predictions."""
-    # Have to be careful in prepping data for estimation.
-    # We need to slice memmap and convert to a proper array - otherwise
-    # estimators can store results memmaped to the cache, which will
-    # prevent the garbage collector from releasing the memmaps from memory
-    # after estimation
-    x, z, _ = _slice_array(X, y, idx[0])
+    # Write transformer list to cache
+    f = os.path.join(dir, '%s__t' % (key if key is not None else case))
+    pickle_save(out, f, CACHE_NBYTES)
 
-    # Load transformers
-    if preprocess:
-        f = os.path.join(dir, '%s__t' % case)
-        tr_list = _load_trans(f, case, ivals, raise_on_exception)
-    else:
-        tr_list = []
 
-    # Transform input
-    for tr_name, tr in tr_list:
-        x = tr.transform(x)
+def fit_est(dir, case, inst_name, inst, X, y, pred, idx, raise_on_exception,
+            preprocess, name, ivals, attr, scorer=None, key=None, copy=True,
+            return_nbytes=None, cache=None):
+    """Fit estimator and write to cache along with predictions.
+
+    Transformers are loaded from the cache under ``key``, or ``case``. If the
+    arrays of the fitted estimator are at most ``return_nbytes`` bytes, it is
+    returned instead of written to the cache. If ``cache`` is a path to an
+    entry in a fit cache, the estimator and its predictions are loaded from
+    it if it exists, and written to it if not. Entries hold test fold
+    predictions by ``attr``, and an entry without predictions for ``attr``
+    is completed.
+    """
+    tei = idx[1]
+    cached = load_cached(cache) if cache is not None else None
+    inst, preds = cached if cached is not None else (inst, dict())
+    p = preds.get(attr)
+
+    tr_list = None
+    if cached is None:
+        # Have to be careful in prepping data for estimation.
+        # We need to slice memmap and convert to a proper array - otherwise
+        # estimators can store results memmaped to the cache, which will
+        # prevent the garbage collector from releasing the memmaps from
+        # memory after estimation
+        x, z = _slice_array(X, y, idx[0], copy)
+
+        # Load transformers
+        tr_list = _get_trans(dir, case, key, preprocess, ivals,
+                             raise_on_exception)
+
+        # Transform input
+        for tr_name, tr in tr_list:
+            x = tr.transform(x)
 
-    # Fit estimator
-    inst.fit(x, z)
+        # Fit estimator
+        inst.fit(x, z)
 
     # Predict if asked
-    # The predict loop is kept separate to allow overwrite of x, thus keeping
-    # only one subset of X in memory at any given time
-    if idx[1] is not None:
-        tei = idx[1]
-        col = idx[2]
+    # The predict loop is kept separate to allow overwrite of x, thus
+    # keeping only one subset of X in memory at any given time
+    if tei is not None and p is None:
+        if tr_list is None:
+            tr_list = _get_trans(dir, case, key, preprocess, ivals,
+                                 raise_on_exception)
 
-        x, z, tei = _slice_array(X, y, tei)
+        x, _ = _slice_array(X, None, tei, copy)
 
         for tr_name, tr in tr_list:
             x = tr.transform(x)
 
-        p = getattr(inst, attr)(x)
+        p = preds[attr] = getattr(inst, attr)(x)
 
-        rebase = X.shape[0] - pred.shape[0]
-        tei -= rebase
+        if cache is not None:
+            save_cached((inst, preds), cache)
 
-        if len(p.shape) == 1:
-            pred[tei, col] = p
-        else:
-            cols = np.arange(col, col + p.shape[1])
-            pred[np.ix_(tei, cols)] = p
+    elif cached is None and cache is not None:
+        save_cached((inst, preds), cache)
+
+    if tei is not None:
+        col = idx[2]
+        z = _slice_array(y, None, tei)[0]
+
+        rebase = X.shape[0] - pred.shape[0]
+        _write(pred, _rows(tei, X.shape[0], rebase), col, p)
 
         try:
             s = scorer(z, p)
@@ -503,14 +1228,58 @@ def fit_est(dir, case, inst_name, inst, X, y, pred, idx, raise_on_exception,
         idx = (None, idx[2])
         s = None
 
+    out = (inst_name, inst, idx, s)
+    if return_nbytes is not None and _nbytes(inst) <= return_nbytes:
+        return out
+
     f = os.path.join(dir, '%s__%s__e' % (case, inst_name))
-    pickle_save((inst_name, inst, idx, s), f)
+    pickle_save(out, f, CACHE_NBYTES)
+
+
+def fit_est_folds(dir, entries, inst, X, y, pred, name, attr, scorer=None,
+                  copy=True, return_nbytes=None):
+    """Fit an estimator on all folds in one call to its ``fit_folds`` method.
 
+    ``entries`` is a list of ``(case, inst_name, tri, tei, col)`` tuples, one
+    per fold. ``inst.fit_folds(X, y, folds)`` is passed the ``(train, test)``
+    row ranges of each fold (see :func:`_rows`) and should return one fitted
+    estimator per fold. Fitted estimators are returned or written to the
+    cache as in :func:`fit_est`.
+    """
+    n = X.shape[0]
+    x, z = _slice_array(X, y, None)
+    folds = [(_rows(tri, n), _rows(tei, n)) for _, _, tri, tei, _ in entries]
 
-def _fit(**kwargs):
-    """Wrapper to select fit_est or fit_trans."""
-    f = fit_trans if kwargs['inst_name'] == '__trans__' else fit_est
-    f(**{k: v for k, v in kwargs.items() if k in f.__code__.co_varnames})
+    fitted = inst.fit_folds(x, z, folds)
+
+    rebase = n - pred.shape[0]
+    out = dict()
+    for (case, inst_name, tri, tei, col), est in zip(entries, fitted):
+        x, z = _slice_array(X, y, tei, copy)
+        p = getattr(est, attr)(x)
+        _write(pred, _rows(tei, n, rebase), col, p)
+
+        try:
+            s = scorer(z, p)
+        except Exception:
+            s = None
+
+        tup = (inst_name, est, (tei, col), s)
+        if return_nbytes is not None and _nbytes(est) <= return_nbytes:
+            out[name, case, inst_name] = tup
+        else:
+            f = os.path.join(dir, '%s__%s__e' % (case, inst_name))
+            pickle_save(tup, f, CACHE_NBYTES)
+    return out
+
+
+###############################################################################
+def _get_trans(dir, case, key, preprocess, ivals, raise_on_exception):
+    """Load the fitted transformers of an estimator, if any."""
+    if not preprocess:
+        return []
+    f = os.path.join(dir, '%s__t' % (key if key is not None else case))
+    return _load_trans(f, case, ivals, raise_on_exception)
 
 
 ###############################################################################
@@ -519,10 +1288,12 @@ def _load_trans(dir, case, ivals, raise_on_exception):
     s = ivals[0]
     lim = ivals[1]
     try:
-        # Assume file exists
-        return pickle_load(dir)
-    except (OSError, IOError) as exc:
-        # We would expect an OSError, but Python 2.7 we get an IOError
+        # Assume file exists. Arrays are memory-mapped since the
+        # transformers are only used within the job
+        return pickle_load(dir, 'r')
+    except _LOAD_ERRORS as exc:
+        # We would expect an OSError, but Python 2.7 we get an IOError.
+        # A truncated pickle is also retried in case it is being written
         msg = str(exc)
         error_msg = ("The file %s cannot be found after %i seconds of "
                      "waiting. Check that time to fit transformers is "
@@ -534,11 +1305,18 @@ def _load_trans(dir, case, ivals, raise_on_exception):
                      " Details:\n%r")
 
         # Wait and check if transformer is readied.
-        ts = time_()
-        while not os.path.exists(dir):
+        ts = t0 = time_()
+        start = wall_time()
+        while True:
 
             sleep(s)
 
+            try:
+                loaded = pickle_load(dir, 'r')
+                break
+            except _LOAD_ERRORS as exc:
+                msg = str(exc)
+
             if time_() - ts > lim:
                 # If timeout limit is reached, raise error
                 if raise_on_exception:
@@ -554,4 +1332,5 @@ def _load_trans(dir, case, ivals, raise_on_exception):
                 raise_on_exception = True
                 ts = time_()
 
-        return pickle_load(dir)
+        add_event('wait %s' % case, start, time_() - t0)
+        return loaded
@@ -9,6 +9,7 @@ Cross-validation jobs for an :class:`Evaluator` instance.
 
 from .estimation import (fit_trans,
                          _slice_array)
+from .store import cache_path, fingerprint, fit_key, save_cached, trans_key
 
 from ..externals.joblib import delayed
 from ..utils import pickle_load
@@ -18,6 +19,8 @@ from ..externals.sklearn.base import clone
 import os
 import warnings
 
+import numpy as np
+
 try:
     from time import perf_counter as time
 except ImportError:
@@ -61,13 +64,22 @@ class Evaluation(object):
         preprocessing = _expand_instance_list(self.evaluator.preprocessing,
                                               self.evaluator.indexer)
 
+        memory = getattr(self.evaluator, 'memory', None)
+        if memory is not None:
+            if not os.path.exists(memory):
+                os.makedirs(memory)
+            fp = fingerprint(X, y)
+
         parallel(delayed(fit_trans)(dir=dir,
                                     case=case,
                                     inst=instance_list,
                                     X=X,
                                     y=y,
                                     idx=tri,
-                                    name=None)
+                                    name=None,
+                                    cache=None if memory is None else
+                                    cache_path(memory, fp,
+                                               trans_key(tri, instance_list)))
                  for case, tri, _, instance_list in preprocessing)
 
         self.evaluator.preprocessing_ = \
@@ -95,23 +107,59 @@ class Evaluation(object):
         estimators = _expand_instance_list(self.evaluator.estimators,
                                            self.evaluator.indexer)
 
-        scores = parallel(delayed(fit_score)(
-                case=case,
+        # Estimators are listed fold by fold for each case, in sorted order.
+        # Entries are paired with their fold and case by position:
+        # fold-specific case names only serve to look up fold transformers.
+        if isinstance(self.evaluator.estimators, dict):
+            case_names = sorted(self.evaluator.estimators)
+        else:
+            case_names = [None]
+
+        n_splits = self.evaluator.indexer.n_splits
+        entries = [(j % n_splits, case_names[j // n_splits], entry)
+                   for j, entry in enumerate(estimators)]
+
+        memory = getattr(self.evaluator, 'memory', None)
+        if memory is not None:
+            if not os.path.exists(memory):
+                os.makedirs(memory)
+            fp = fingerprint(X, y)
+            cases = getattr(self.evaluator, 'preprocessing', None)
+
+        def cache(case, tri, tei, est, params):
+            """Path to the fit cache entry of a parameter draw."""
+            if memory is None:
+                return None
+            tr = cases[case] if case is not None else None
+            est = clone(est).set_params(**params)
+            return cache_path(memory, fp, fit_key(tri, tei, tr, est))
+
+        params = self.evaluator.params
+        draws = {name: list(range(len(p))) for name, p in params.items()}
+
+        scores = list()
+        for r, folds in enumerate(self.evaluator._fold_schedule()):
+            if r > 0:
+                draws = _halve(scores, draws, self.evaluator.halving)
+
+            scores.extend(parallel(delayed(fit_score)(
+                case=name,
                 tr_list=preprocessing[case] if case in preprocessing else [],
                 est_name=est_name,
                 est=est,
-                params=(i, params),
+                params=(i, params[_name(name, est_name)][i]),
                 X=X,
                 y=y,
                 idx=(tri, tei),
                 scorer=self.evaluator.scorer,
-                error_score=self.evaluator.error_score)
-                          for case, tri, tei, est_list in estimators
-                          for est_name, est in est_list
-                          for i, params in
-                          enumerate(
-                                  self.evaluator.params[_name(case, est_name)]
-                                    ))
+                error_score=self.evaluator.error_score,
+                cache=cache(name, tri, tei, est,
+                            params[_name(name, est_name)][i]))
+                for f, name, (case, tri, tei, est_list) in entries
+                if f in folds
+                for est_name, est in est_list
+                for i in draws[_name(name, est_name)]))
+
         self.evaluator.scores_ = scores
 
 
@@ -119,25 +167,47 @@ class Evaluation(object):
 def _name(case, est_name):
     """Get correct param_dict name."""
     if case is not None:
-        return case.split('__')[0], est_name.split('__')[0]
+        return case, est_name
     else:
-        return est_name.split('__')[0]
+        return est_name
+
+
+def _halve(scores, draws, factor):
+    """Keep the draws with the best mean test score for each estimator.
+
+    Draws with a ``nan`` score, such as failed draws with
+    ``error_score=np.nan``, are ranked last.
+    """
+    test_scores = dict()
+    for case, est_name, i, _, test_score, _ in scores:
+        test_scores.setdefault((_name(case, est_name), i), []).append(
+            test_score)
+
+    out = dict()
+    for name, draw_nums in draws.items():
+        n_keep = int(np.ceil(len(draw_nums) / float(factor)))
+        means = {i: np.mean(test_scores[name, i]) for i in draw_nums}
+        out[name] = sorted(
+            draw_nums,
+            key=lambda i: -np.inf if np.isnan(means[i]) else means[i],
+            reverse=True)[:n_keep]
+    return out
 
 
 def fit_score(case, tr_list, est_name, est, params, X, y, idx, scorer,
-              error_score):
+              error_score, cache=None):
     """Wrapper around fit function to determine how to handle exceptions."""
 
     if error_score is None:
         # If fit or scoring fails, we raise errors.
         return _fit_score(case, tr_list, est_name, est, params, X, y, idx,
-                          scorer, error_score)
+                          scorer, error_score, cache)
 
     else:
         # Otherwise, we issue a warning and set an error score.
         try:
             return _fit_score(case, tr_list, est_name, est, params, X, y, idx,
-                              scorer, error_score)
+                              scorer, error_score, cache)
         except Exception as exception:
 
             warnings.warn("Cross validation failed. Setting error score {}"
@@ -147,12 +217,16 @@ def fit_score(case, tr_list, est_name, est, params, X, y, idx, scorer,
 
 
 def _fit_score(case, tr_list, est_name, est, params, X, y, idx, scorer,
-               error_score):
-    """Fit an estimator and generate scores for train and test set."""
+               error_score, cache=None):
+    """Fit an estimator and generate scores for train and test set.
+
+    If ``cache`` is a path to an entry in a fit cache, the fitted estimator
+    is written to it for ensembles to reuse.
+    """
     est = clone(est).set_params(**params[1])
 
     # Prepare training set
-    xtrain, ytrain, _ = _slice_array(X, y, idx[0])
+    xtrain, ytrain = _slice_array(X, y, idx[0])
 
     for tr_name, tr in tr_list:
         xtrain = tr.transform(xtrain)
@@ -168,8 +242,11 @@ def _fit_score(case, tr_list, est_name, est, params, X, y, idx, scorer,
     est = est.fit(xtrain, ytrain)
     fit_time = time() - t0
 
+    if cache is not None and not os.path.exists(cache + '.pkl'):
+        save_cached((est, dict()), cache)
+
     # Prepare test set
-    xtest, ytest, _ = _slice_array(X, y, idx[1])
+    xtest, ytest = _slice_array(X, y, idx[1])
 
     for tr_name, tr in tr_list:
         xtest = tr.transform(xtest)
@@ -185,9 +262,8 @@ def _fit_score(case, tr_list, est_name, est, params, X, y, idx, scorer,
 def _expand_instance_list(instance_list, indexer):
     """Build a list of fold-specific estimation tuples w. train and test idx.
 
-    The full learner library is copied for each fold and used for building
-    the Z matrix of dimensions n * (L), where n is the number of training
-    samples and L number of base learners.
+    The full learner library is copied for each fold. Entries are listed fold
+    by fold for each case, and estimators keep their names.
 
     See Also
     --------
@@ -200,12 +276,11 @@ def _expand_instance_list(instance_list, indexer):
         # --- Folds ---
         # Estimators to be fitted on each fold. List entries have format:
         # (case__fold_num, train_idx, test_idx, est_list)
-        # Each est_list have entries (inst_name__fol_num, cloned_est)
+        # Each est_list have entries (inst_name, cloned_est)
         return [('%s__f%i' % (case, i % splits),
                  tri,
                  tei,
-                 [('%s__f%i' % (n, i % splits), clone(e)) for n, e in
-                  instance_list[case]])
+                 [(n, clone(e)) for n, e in instance_list[case]])
                 for case in sorted(instance_list)
                 for i, (tri, tei) in enumerate(indexer.generate())
                 ]
@@ -214,11 +289,10 @@ def _expand_instance_list(instance_list, indexer):
 
         # Estimators to be fitted on each fold. List entries have format:
         # (None, train_idx, test_idx, est_list)
-        # Each est_list have entries (inst_name__fol_num, cloned_est)
+        # Each est_list have entries (inst_name, cloned_est)
         return [(None,
                  tri,
                  tei,
-                 [('%s__f%i' % (n, i % splits), clone(e)) for n, e in
-                  instance_list])
+                 [(n, clone(e)) for n, e in instance_list])
                 for i, (tri, tei) in enumerate(indexer.generate())
                 ]
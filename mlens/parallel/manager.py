@@ -12,12 +12,18 @@ import shutil
 import subprocess
 import tempfile
 import warnings
+from itertools import islice
 
 import numpy as np
 
 from . import Blender, Evaluation, SingleRun, Stacker, SubStacker
+from .profile import profiled
+from .scheduler import Scheduler
+from .estimation import _return_nbytes
 from ..externals.joblib import Parallel, dump, load
-from ..utils import check_initialized
+from ..externals.joblib import hash as joblib_hash
+from ..externals.joblib.pool import has_shareable_memory
+from ..utils import annotate, check_initialized
 from ..utils.exceptions import (ParallelProcessingError,
                                 ParallelProcessingWarning)
 
@@ -33,14 +39,85 @@ JOBS = ['predict', 'fit', 'transform']
 
 
 ###############################################################################
-def _load(arr):
-    """Load array from file using default settings."""
+def _load(arr, dir, name, chunk_size=10000):
+    """Stream a text file into a ``.npy`` file in the cache.
+
+    The file is read ``chunk_size`` rows at a time, so it never has to fit in
+    memory. Values are separated by commas if the first row has a comma, and
+    by whitespace otherwise. As with :func:`numpy.genfromtxt`, fields that
+    cannot be parsed, such as a header row, are read as ``nan``.
+    """
     try:
-        return np.genfromtxt(arr)
+        with open(arr, 'rb') as fh:
+            rows = (line for line in fh
+                    if line.strip() and not line.lstrip().startswith(b'#'))
+            first = next(rows)
+            n_rows = 1 + sum(1 for _ in rows)
+
+        delimiter = b',' if b',' in first else None
+        n_cols = len(first.split(delimiter))
+        shape = (n_rows, n_cols) if n_cols > 1 else (n_rows,)
+
+        f = os.path.join(dir, '%s.npy' % name)
+        out = np.lib.format.open_memmap(f, mode='w+', dtype=np.float64,
+                                        shape=shape)
+
+        with open(arr, 'rb') as fh:
+            rows = (line for line in fh
+                    if line.strip() and not line.lstrip().startswith(b'#'))
+            i = 0
+            chunk = list(islice(rows, chunk_size))
+            while chunk:
+                j = i + len(chunk)
+                out[i:j] = np.genfromtxt(
+                    chunk, delimiter=delimiter).reshape(out[i:j].shape)
+                i = j
+                chunk = list(islice(rows, chunk_size))
+
+        out.flush()
+        del out
+        return f
+
     except Exception as e:
         raise IOError("Could not load X from %s, does not "
                       "appear to be a valid ndarray. "
-                      "Details:\n%r" % e)
+                      "Details:\n%r" % (arr, e))
+
+
+def _load_input(arr, dir, name):
+    """Get a read-only memmap of an input array or file.
+
+    Arrays backed by a memmap are passed on as read-only views, and
+    ``.mmap``, ``.npy`` and ``.npz`` files are mapped directly. Text files
+    are streamed into the cache and other arrays are dumped to it.
+    """
+    if has_shareable_memory(arr):
+        # Already on disk: workers will map the same file
+        arr = arr.view()
+        arr.flags.writeable = False
+        return arr
+
+    if isinstance(arr, str):
+        if not arr.split('.')[-1] in ['mmap', 'npy', 'npz']:
+            # Try loading the file assuming a csv-like format
+            arr = _load(arr, dir, name)
+        return _load_mmap(arr)
+
+    # Dump ndarray on disk
+    f = os.path.join(dir, '%s.mmap' % name)
+    if os.path.exists(f):
+        os.unlink(f)
+    dump(arr, f)
+    return _load_mmap(f)
+
+
+def _overlap(a, b):
+    """Check if any of the row ranges in ``a`` and ``b`` intersect."""
+    for a0, a1 in a:
+        for b0, b1 in b:
+            if a0 < b1 and b0 < a1:
+                return True
+    return False
 
 
 def _load_mmap(f):
@@ -93,11 +170,23 @@ class ParallelProcessing(object):
         self.__initialized__ = 0
         self.__fitted__ = 0
 
-    def initialize(self, job, X, y=None, dir=None):
-        """Create a job instance for estimation."""
+    def initialize(self, job, X, y=None, dir=None, in_memory=False,
+                   buffers=None):
+        """Create a job instance for estimation.
+
+        If ``in_memory=True``, no cache is created: ``X`` is used as is and
+        prediction arrays are allocated in process memory, or taken from the
+        leading rows of ``buffers``, one array per layer. Workers must then
+        share memory with the parent, so this is for prediction on small
+        batches where the cache overhead dominates.
+        """
         self._check_job(job)
         self.job = Job(job)
 
+        if in_memory:
+            self._initialize_memory(X, buffers)
+            return
+
         try:
             # Fails on python 2
             self.job.tmp = tempfile.TemporaryDirectory(prefix='mlens_',
@@ -113,28 +202,12 @@ class ParallelProcessing(object):
                 # Can happen if y is not specified (i.e. during prediction)
                 continue
 
-            if isinstance(arr, str):
-                # Load file from disk. Need to dump if not memmaped already
-                if not arr.split('.')[-1] in ['mmap', 'npy', 'npz']:
-                    # Try loading the file assuming a csv-like format
-                    arr = _load(arr)
-
-            if isinstance(arr, str):
-                # If arr remains a string, it's pointing to an mmap file
-                f = arr
-            else:
-                # Dump ndarray on disk
-                f = os.path.join(self.job.dir, '%s.mmap' % name)
-                if os.path.exists(f):
-                    os.unlink(f)
-                dump(arr, f)
-
             # Get memmap in read-only mode (we don't want to corrupt the input)
             if name is 'y' and y is not None:
-                self.job.y = _load_mmap(f)
+                self.job.y = self._load_input(arr, name)
             else:
                 # Store X as the first input matrix in list of inputs matrices
-                self.job.P = [_load_mmap(f)]
+                self.job.P = [self._load_input(arr, name)]
 
         # Append pre-allocated prediction arrays in r+ to the P list
         # Each layer will be fitted on P[i] and write to P[i + 1]
@@ -150,7 +223,7 @@ class ParallelProcessing(object):
             shape = self._get_lyr_sample_size(lyr)
 
             self.job.P.append(np.memmap(filename=f,
-                                        dtype=np.float,
+                                        dtype=self.layers.dtype,
                                         mode='w+',
                                         shape=shape))
 
@@ -159,6 +232,43 @@ class ParallelProcessing(object):
         # Release any memory before going into process
         gc.collect()
 
+    def _load_input(self, arr, name):
+        """Get a read-only memmap of an input.
+
+        While the container has an open pool, the last array passed as each
+        input is kept mapped, and reused if the next call passes an array
+        with the same contents.
+        """
+        inputs = getattr(self.layers, '_inputs', None)
+        if (inputs is None or not isinstance(arr, np.ndarray) or
+                has_shareable_memory(arr)):
+            return _load_input(arr, self.job.dir, name)
+
+        key = joblib_hash(arr)
+        if name not in inputs or inputs[name][0] != key:
+            # Release the memmap before overwriting its file
+            inputs.pop(name, None)
+            inputs[name] = (key, _load_input(arr, self.layers._input_dir,
+                                             name))
+        return inputs[name][1]
+
+    def _initialize_memory(self, X, buffers=None):
+        """Allocate prediction arrays in memory."""
+        self.job.P = [X]
+        for n, lyr in enumerate(self.layers.layers.values()):
+            # Prediction only needs the number of rows, so the indexer is not
+            # refitted: a batch can be smaller than the number of folds
+            _, s1 = self._get_lyr_sample_size(lyr)
+            shape = (self.job.P[n].shape[0], s1)
+
+            if buffers is not None:
+                # Every column is overwritten, so buffers need no reset
+                self.job.P.append(buffers[n][:shape[0]])
+            else:
+                self.job.P.append(np.zeros(shape, dtype=self.layers.dtype))
+
+        self.__initialized__ = 1
+
     def _get_lyr_sample_size(self, lyr):
         """Decide what sample size to create P with based on the job type."""
         # Sample size is full for prediction, for fitting
@@ -195,20 +305,46 @@ class ParallelProcessing(object):
         """Fit all layers in the attached :class:`LayerContainer`."""
         check_initialized(self)
 
-        # Use context manager to ensure same parallel job during entire process
-        with Parallel(n_jobs=self.layers.n_jobs,
-                      temp_folder=self.job.dir,
-                      max_nbytes=None,
-                      mmap_mode='r+',
-                      verbose=self.layers.verbose,
-                      backend=self.layers.backend) as parallel:
+        parallel = getattr(self.layers, '_parallel', None)
+        if self.job.dir is None:
+            # In-memory job: only threads can write to the prediction arrays
+            threading = self.layers.backend == 'threading'
+            if parallel is not None and threading:
+                self._process(parallel)
+            else:
+                with Parallel(n_jobs=self.layers.n_jobs if threading else 1,
+                              backend='threading') as parallel:
+                    self._process(parallel)
+        elif parallel is not None:
+            # Reuse the pool of workers the container has kept open
+            self._process(parallel)
+        else:
+            # Use context manager to ensure same parallel job during entire
+            # process
+            with Parallel(n_jobs=self.layers.n_jobs,
+                          temp_folder=self.job.dir,
+                          max_nbytes=None,
+                          mmap_mode='r+',
+                          verbose=self.layers.verbose,
+                          backend=self.layers.backend) as parallel:
+                self._process(parallel)
+
+        annotate(None)
+        self.__fitted__ = 1
 
+    def _process(self, parallel):
+        """Process all layers with a given parallel instance."""
+        # Fingerprints of layer inputs are only known once the previous
+        # layer is fitted
+        layerwise = self.job.j == 'fit' and (
+            self.layers.warm_start or self.layers.memory is not None)
+        if self.layers.scheduler and not layerwise:
+            self._graph_process(parallel)
+        else:
             for n, lyr in enumerate(self.layers.layers.values()):
                 self._partial_process(n, lyr, parallel)
 
-        self.__fitted__ = 1
-
-    def get_preds(self, n=-1, dtype=np.float, order='C'):
+    def get_preds(self, n=-1, dtype=None, order='C'):
         """Return prediction matrix.
 
         Parameters
@@ -219,8 +355,9 @@ class ParallelProcessing(object):
             List slicing is accepted, so ``n = -1`` retrieves the final
             predictions.
 
-        dtype : object (default = numpy.float)
-            data type to return
+        dtype : object (default = None)
+            data type to return. Defaults to the data type of the prediction
+            matrices.
 
         order : str (default = 'C')
             data order. See :class:`numpy.asarray` for details.
@@ -235,6 +372,12 @@ class ParallelProcessing(object):
 
     def terminate(self):
         """Remove temporary folder and all cache data."""
+        if self.job.dir is None:
+            # Nothing cached for in-memory jobs
+            del self.job
+            self.__initialized__ = 0
+            return
+
         # Delete all contents from cache
         try:
             self.job.tmp.cleanup()
@@ -270,11 +413,64 @@ class ParallelProcessing(object):
 
             self.__initialized__ = 0
 
+    @staticmethod
+    def _get_engine(lyr):
+        """Fire up the estimation instance of a layer."""
+        kwd = lyr.cls_kwargs if lyr.cls_kwargs is not None else {}
+        return ENGINES[lyr.cls](lyr, **kwd)
+
+    def _graph_process(self, parallel):
+        """Process all layers as one graph of tasks.
+
+        Every task of every layer is a node in the graph. A task depends on
+        the tasks in the previous layer that write to rows it reads, and not
+        on the layer as a whole. Hence, a task can start as soon as its input
+        is ready, and a slow estimator only holds up the tasks that need its
+        predictions.
+        """
+        annotate(self.job.j)
+        schedule = Scheduler(parallel)
+
+        layers, writers = list(), list()
+        for n, (name, lyr) in enumerate(self.layers.layers.items()):
+            e = self._get_engine(lyr)
+            X, P = self.job.P[n], self.job.P[n + 1]
+
+            if self.job.j == 'fit':
+                # Layers are fitted concurrently, so each layer needs its own
+                # cache to avoid name clashes between fitted instances
+                dir = os.path.join(self.job.dir, name)
+                os.mkdir(dir)
+                tasks = e._fit_tasks(X, self.job.y, P, dir,
+                                     _return_nbytes(parallel))
+            else:
+                e._check_fitted()
+                tasks = getattr(e, '_%s_tasks' % self.job.j)(
+                    X, P, self.job.dir)
+
+            layer_writers = list()
+            for name, func, kwargs, deps, reads, writes in tasks:
+                deps = deps + [w for w, rows in writers
+                               if _overlap(rows, reads)]
+                schedule.add(name, profiled, dict(func=func, kwargs=kwargs),
+                             deps)
+
+                if writes:
+                    layer_writers.append((name, writes))
+
+            writers = layer_writers
+            layers.append((e, tasks, X))
+
+        results = schedule.run()
+
+        for e, tasks, X in layers:
+            out = e._record(self.job.j, tasks, results, X)
+            if self.job.j == 'fit':
+                e._assemble(os.path.join(self.job.dir, e.name), out)
+
     def _partial_process(self, n, lyr, parallel):
         """Generic method for processing a :class:`layer` with ``attr``."""
-        # Fire up the estimation instance
-        kwd = lyr.cls_kwargs if lyr.cls_kwargs is not None else {}
-        e = ENGINES[lyr.cls](lyr, **kwd)
+        e = self._get_engine(lyr)
 
         # Get function to process and its variables
         f = getattr(e, self.job.j)
@@ -288,6 +484,10 @@ class ParallelProcessing(object):
                   self.job.__slots__}
 
         kwargs['parallel'] = parallel
+        if 'warm_start' in fargs:
+            kwargs['warm_start'] = self.layers.warm_start
+        if 'memory' in fargs:
+            kwargs['memory'] = self.layers.memory
         if 'X' in fargs:
             kwargs['X'] = self.job.P[n]
         if 'P' in fargs:
@@ -328,27 +528,11 @@ class ParallelEvaluation(object):
         # Build mmaps for inputs
         for name, arr in zip(('X', 'y'), (X, y)):
 
-            if isinstance(arr, str):
-                # Load file from disk. Need to dump if not memmaped already
-                if not arr.split('.')[-1] in ['mmap', 'npy', 'npz']:
-                    # Try loading the file assuming a csv-like format
-                    arr = _load(arr)
-
-            if isinstance(arr, str):
-                # If arr remains a string, it's pointing to an mmap file
-                f = arr
-            else:
-                # Dump ndarray on disk
-                f = os.path.join(self.job.dir, '%s.mmap' % name)
-                if os.path.exists(f):
-                    os.unlink(f)
-                dump(arr, f)
-
             # Get memmap in read-only mode (we don't want to corrupt the input)
             if name is 'y':
-                self.job.y = _load_mmap(f)
+                self.job.y = _load_input(arr, self.job.dir, name)
             else:
-                self.job.P = _load_mmap(f)
+                self.job.P = _load_input(arr, self.job.dir, name)
 
         self.__initialized__ = 1
 
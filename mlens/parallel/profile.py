@@ -0,0 +1,238 @@
+"""ML-ENSEMBLE
+
+:author: Sebastian Flennerhag
+:copyright: 2017
+:licence: MIT
+
+Per-task timing and memory measurements, and export of task timelines.
+"""
+
+from __future__ import division
+
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from time import time as wall_time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+try:
+    from threading import get_ident
+except ImportError:
+    from thread import get_ident
+
+try:
+    from time import perf_counter as time_
+except ImportError:
+    from time import time as time_
+
+
+COLUMNS = ['layer', 'job', 'task', 'func', 'pid', 'tid', 'start', 'duration',
+           'nbytes', 'rss']
+
+# Columns listed by Profile.table
+TABLE_COLUMNS = ['layer', 'job', 'task', 'func', 'pid', 'start', 'duration',
+                 'nbytes', 'rss']
+
+# Events of the task running in each thread
+_local = threading.local()
+
+
+class Profile(list):
+
+    """List of task records from fitting or predicting with layers.
+
+    Each record is a dict with the following entries:
+
+        - ``layer``: name of the layer.
+        - ``job``: ``'fit'``, ``'predict'`` or ``'transform'``.
+        - ``task``: name of the task in the layer, i.e. ``(case, estimator)``
+          for estimators and ``(i, '__trans__')`` for the transformers of the
+          ``i``-th preprocessing case.
+        - ``func``: name of the task function.
+        - ``pid``, ``tid``: process and thread id of the worker that ran
+          the task.
+        - ``start``: time the task started, in seconds since the epoch.
+        - ``duration``: time the task ran for, in seconds.
+        - ``nbytes``: bytes of input rows the task sliced.
+        - ``rss``: increase in peak resident set size of the worker during
+          the task, in bytes. ``None`` where not available. Tasks run in
+          threads share the peak of the process.
+        - ``events``: list of ``(name, start, duration)`` tuples of events
+          within the task, such as waiting on transformers.
+
+    A profile can be passed to :class:`pandas.DataFrame` as is, printed with
+    :meth:`table` or exported as a timeline with :meth:`trace`.
+    """
+
+    def columns(self):
+        """Return the records as an ordered dict of columns."""
+        return OrderedDict((c, [r[c] for r in self]) for c in COLUMNS)
+
+    def table(self, sort='duration', n=None):
+        """Format the records as a text table.
+
+        Parameters
+        ----------
+        sort : str or None (default = 'duration')
+            column to sort records on, in descending order, with missing
+            values last. If ``None``, records are listed in the order they
+            were recorded.
+
+        n : int or None (default = None)
+            maximum number of records to list.
+
+        Returns
+        -------
+        table : str
+            table with one row per record. ``start`` is given relative to
+            the first task.
+        """
+        records = list(self)
+        if sort is not None:
+            records.sort(key=lambda r: (r[sort] is not None, r[sort]),
+                         reverse=True)
+        if n is not None:
+            records = records[:n]
+
+        t0 = min([r['start'] for r in self]) if self else 0
+        rows = [TABLE_COLUMNS]
+        for r in records:
+            rows.append([r['layer'], r['job'],
+                         '/'.join([str(p) for p in r['task']]), r['func'],
+                         str(r['pid']), '%.3f' % (r['start'] - t0),
+                         '%.3f' % r['duration'], _format_bytes(r['nbytes']),
+                         _format_bytes(r['rss'])])
+
+        widths = [max([len(row[i]) for row in rows])
+                  for i in range(len(TABLE_COLUMNS))]
+        lines = ['  '.join([v.rjust(w) if i > 3 else v.ljust(w)
+                            for i, (v, w) in enumerate(zip(row, widths))])
+                 for row in rows]
+        return '\n'.join([line.rstrip() for line in lines])
+
+    def trace(self, path=None):
+        """Export the records as a Chrome trace.
+
+        The trace has one row per worker, with one bar per task and per
+        event within a task. Open it in ``chrome://tracing`` or
+        `Perfetto <https://ui.perfetto.dev>`_ to see idle workers, waiting
+        on transformers and straggling tasks.
+
+        Parameters
+        ----------
+        path : str or None (default = None)
+            file to write the trace to, as JSON.
+
+        Returns
+        -------
+        trace : dict
+            the trace, in the Trace Event Format.
+        """
+        t0 = min([r['start'] for r in self]) if self else 0
+
+        def us(t):
+            return int(round(t * 1e6))
+
+        events = list()
+        for pid in sorted(set([r['pid'] for r in self])):
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                           'args': {'name': 'worker %i' % pid}})
+
+        for r in self:
+            task = '/'.join([str(p) for p in r['task']])
+            events.append({'name': '%s %s' % (r['layer'], task),
+                           'cat': r['func'],
+                           'ph': 'X',
+                           'ts': us(r['start'] - t0),
+                           'dur': us(r['duration']),
+                           'pid': r['pid'],
+                           'tid': r['tid'],
+                           'args': {'job': r['job'],
+                                    'nbytes': r['nbytes'],
+                                    'rss': r['rss']}})
+
+            for name, start, duration in r['events']:
+                events.append({'name': name,
+                               'cat': 'event',
+                               'ph': 'X',
+                               'ts': us(start - t0),
+                               'dur': us(duration),
+                               'pid': r['pid'],
+                               'tid': r['tid']})
+
+        trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if path is not None:
+            with open(path, 'w') as f:
+                json.dump(trace, f)
+        return trace
+
+
+def profiled(func, kwargs):
+    """Call a task function and measure the call.
+
+    Returns
+    -------
+    out : obj
+        output of ``func(**kwargs)``.
+
+    stats : tuple
+        ``(pid, tid, start, duration, rss, events)``, see :class:`Profile`.
+    """
+    _local.events = events = list()
+    rss = _peak_rss()
+    start, t0 = wall_time(), time_()
+    try:
+        out = func(**kwargs)
+    finally:
+        _local.events = None
+    duration = time_() - t0
+    if rss is not None:
+        rss = _peak_rss() - rss
+    return out, (os.getpid(), get_ident(), start, duration, rss, events)
+
+
+def add_event(name, start, duration):
+    """Add an event to the task running in this thread, if it is measured.
+
+    Parameters
+    ----------
+    name : str
+        name of the event.
+
+    start : float
+        time the event started, in seconds since the epoch.
+
+    duration : float
+        time the event lasted, in seconds.
+    """
+    events = getattr(_local, 'events', None)
+    if events is not None:
+        events.append((name, start, duration))
+
+
+def _peak_rss():
+    """Peak resident set size of the process in bytes, if available."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _format_bytes(n):
+    """Human readable byte count."""
+    if n is None:
+        return '-'
+    for unit in ['B', 'kB', 'MB', 'GB']:
+        if abs(n) < 1024:
+            return '%.0f%s' % (n, unit) if unit == 'B' else \
+                '%.1f%s' % (n, unit)
+        n /= 1024
+    return '%.1fTB' % n
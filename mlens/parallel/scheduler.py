@@ -0,0 +1,268 @@
+"""ML-ENSEMBLE
+
+:author: Sebastian Flennerhag
+:copyright: 2017
+:licence: MIT
+
+Dependency-aware task scheduling on top of a joblib pool.
+"""
+
+import threading
+import traceback
+from collections import deque
+
+from ..externals.joblib.parallel import SafeFunction
+from ..externals.joblib.my_exceptions import (TransportableException,
+                                              _mk_exception)
+from ..utils.exceptions import ParallelProcessingError
+
+
+###############################################################################
+class Task(object):
+
+    """Container for a scheduled call.
+
+    Parameters
+    ----------
+    name : hashable
+        unique task identifier. Other tasks refer to this name when
+        declaring dependencies.
+
+    func : callable
+        function to call.
+
+    kwargs : dict
+        keyword arguments to call ``func`` with.
+
+    deps : iterable
+        names of tasks that must complete before this task is dispatched.
+    """
+
+    __slots__ = ['name', 'func', 'kwargs', 'deps', 'children', 'n_wait']
+
+    def __init__(self, name, func, kwargs, deps=()):
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs
+        self.deps = tuple(deps)
+        self.children = list()
+        self.n_wait = 0
+
+
+def _call(func, kwargs):
+    """Run a task in a worker and trap any exception in the return value.
+
+    Exceptions are returned rather than raised so that the pool callback
+    always fires and the parent can abort the schedule. Exceptions carry the
+    formatted worker traceback.
+    """
+    try:
+        return True, SafeFunction(func)(**kwargs)
+    except TransportableException as exc:
+        return False, exc
+    except Exception as exc:
+        return False, TransportableException(traceback.format_exc(),
+                                             type(exc))
+
+
+###############################################################################
+class Scheduler(object):
+
+    """Dispatch tasks as soon as the tasks they depend on have completed.
+
+    The scheduler uses the pool of an open :class:`joblib.Parallel` instance
+    and dispatches a task through the pool's ``apply_async`` method only
+    once all its dependencies have returned. Hence, no worker is ever handed
+    a task it must wait on. If the ``Parallel`` instance has no pool (i.e.
+    ``n_jobs=1``), tasks are run sequentially in topological order.
+
+    Parameters
+    ----------
+    parallel : :class:`joblib.Parallel`
+        an instance opened as a context manager.
+
+    Examples
+    --------
+    >>> from mlens.externals.joblib import Parallel
+    >>> from mlens.parallel.scheduler import Scheduler
+    >>> with Parallel(n_jobs=2, backend='threading') as parallel:
+    ...     s = Scheduler(parallel)
+    ...     _ = s.add('a', pow, {'x': 2, 'y': 2})
+    ...     _ = s.add('b', pow, {'x': 3, 'y': 2}, deps=['a'])
+    ...     out = s.run()
+    >>> out['a'], out['b']
+    (4, 9)
+    """
+
+    def __init__(self, parallel):
+        self.parallel = parallel
+        self.tasks = list()
+        self.results = dict()
+        self._names = dict()
+
+    def add(self, name, func, kwargs, deps=()):
+        """Add a task to the schedule.
+
+        Parameters
+        ----------
+        name : hashable
+            unique task identifier.
+
+        func : callable
+            function to call.
+
+        kwargs : dict
+            keyword arguments to call ``func`` with.
+
+        deps : iterable (default = ())
+            names of previously added tasks that must complete first. Since
+            dependencies must already be scheduled, the schedule can never
+            contain a cycle.
+
+        Returns
+        -------
+        name : hashable
+            the task name.
+        """
+        if name in self._names:
+            raise ValueError("Task %r already scheduled." % (name,))
+
+        task = Task(name, func, kwargs, deps)
+        for dep in task.deps:
+            if dep not in self._names:
+                raise ValueError("Task %r depends on unknown task %r."
+                                 % (name, dep))
+            self._names[dep].children.append(task)
+
+        task.n_wait = len(task.deps)
+        self._names[name] = task
+        self.tasks.append(task)
+        return name
+
+    def run(self):
+        """Run all tasks.
+
+        Returns
+        -------
+        results : dict
+            mapping of task names to return values.
+        """
+        pool = getattr(self.parallel, '_pool', None)
+        ready = deque(task for task in self.tasks if task.n_wait == 0)
+
+        if not ready:
+            return self.results
+
+        if pool is None:
+            self._run_sequential(ready)
+        else:
+            self._run_async(pool, ready)
+
+        return self.results
+
+    def _run_sequential(self, ready):
+        """Run tasks one at a time in topological order."""
+        while ready:
+            task = ready.popleft()
+            self.results[task.name] = task.func(**task.kwargs)
+            ready.extend(self._release(task))
+
+    def _run_async(self, pool, ready):
+        """Dispatch tasks to the pool as their dependencies complete."""
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._pending = len(self.tasks)
+        self._error = None
+        self._submitted = list()
+
+        for task in ready:
+            self._submit(pool, task)
+
+        # Wait with a timeout to remain responsive to KeyboardInterrupt
+        while not self._done.wait(0.5):
+            self._check_lost()
+
+        if self._error is not None:
+            raise self._error
+
+    def _submit(self, pool, task):
+        """Send a task to the pool."""
+        result = pool.apply_async(_call, (task.func, task.kwargs),
+                                  callback=self._callback(pool, task))
+        with self._lock:
+            self._submitted.append((task, result))
+
+    def _check_lost(self):
+        """Abort the run if a task failed without firing its callback.
+
+        This happens if the return value of a task, or the exception it
+        trapped, cannot be sent back from the worker.
+        """
+        with self._lock:
+            submitted = [(task, result) for task, result in self._submitted
+                         if not result.ready() or not result.successful()]
+            self._submitted = [(task, result) for task, result in submitted
+                               if not result.ready()]
+
+        for task, result in submitted:
+            if not result.ready():
+                continue
+
+            try:
+                result.get()
+                exc = None
+            except Exception as e:
+                exc = e
+
+            with self._lock:
+                if self._error is None:
+                    self._error = ParallelProcessingError(
+                        "Task %r failed without returning. Details:\n%r"
+                        % (task.name, exc))
+            self._done.set()
+            return
+
+    def _callback(self, pool, task):
+        """Build the completion callback of a task."""
+        def callback(out):
+            success, value = out
+
+            with self._lock:
+                if self._error is not None:
+                    return
+
+                if not success:
+                    self._error = _rebuild_exception(value)
+                    self._done.set()
+                    return
+
+                self.results[task.name] = value
+                self._pending -= 1
+                released = self._release(task)
+                finished = self._pending == 0
+
+            for child in released:
+                self._submit(pool, child)
+
+            if finished:
+                self._done.set()
+
+        return callback
+
+    @staticmethod
+    def _release(task):
+        """Decrement the wait count of children and return those now ready."""
+        released = list()
+        for child in task.children:
+            child.n_wait -= 1
+            if child.n_wait == 0:
+                released.append(child)
+        return released
+
+
+def _rebuild_exception(exc):
+    """Convert a transported worker exception into a local exception."""
+    if isinstance(exc, TransportableException):
+        return _mk_exception(exc.etype)[0](
+            "Sub-process traceback:\n%s\n%s" % (75 * '-', exc.message))
+    return exc
@@ -21,8 +21,9 @@ class SingleRun(BaseEstimator):
     Class for fitting a estimators in a layer without any sub-fits.
     """
 
-    def __init__(self, layer, dual=True):
-        super(SingleRun, self).__init__(layer=layer, dual=dual)
+    def __init__(self, layer, dual=True, scheduler=False, copy=True):
+        super(SingleRun, self).__init__(layer=layer, dual=dual,
+                                        scheduler=scheduler, copy=copy)
 
     def _format_instance_list(self):
         """Expand the instance lists to every fold with associated indices."""
@@ -31,11 +32,6 @@ class SingleRun(BaseEstimator):
 
         return e, t
 
-    def _get_col_id(self):
-        """Assign unique col_id to every estimator."""
-        c = getattr(self.layer, 'classes_', 1)
-        return _get_col_idx(self.layer.preprocessing, self.layer.estimators, c)
-
 
 ###############################################################################
 def _expand_instance_list(instance_list):
@@ -49,32 +45,3 @@ def _expand_instance_list(instance_list):
     else:
         return [(None, None, None,
                  [(n, clone(e)) for n, e in instance_list])]
-
-
-def _get_col_idx(preprocessing, estimators, labels):
-    """Utility for assigning each ``est`` in each ``prep`` a unique ``col_id``.
-
-    Parameters
-    ----------
-    preprocessing : dict or list
-        mapping of preprocessing cases, if any.
-
-    estimators : dict or list
-        mapping of estimators per preprocessing case, or list of estimators.
-    """
-    inc = 1 if labels is None else labels
-
-    # Set up main columns mapping
-    if isinstance(preprocessing, list) or preprocessing is None:
-        idx = {(None, inst_name): int(inc * i) for i, (inst_name, _) in
-               enumerate(estimators)}
-    else:
-        # Nested for loop required
-        case_list, idx, col = sorted(preprocessing), dict(), 0
-
-        for case in case_list:
-            for inst_name, _ in estimators[case]:
-                idx[case, inst_name] = col
-                col += inc
-
-    return idx
@@ -7,8 +7,7 @@
 Estimation engine for parallel preprocessing of stacked layer.
 """
 
-from ..externals.sklearn.base import clone
-from .estimation import BaseEstimator
+from .estimation import BaseEstimator, _replicate
 
 
 ###############################################################################
@@ -19,8 +18,9 @@ class Stacker(BaseEstimator):
     Class for fitting a Layer using Stacking.
     """
 
-    def __init__(self, layer, dual=True):
-        super(Stacker, self).__init__(layer=layer, dual=dual)
+    def __init__(self, layer, dual=True, scheduler=False, copy=True):
+        super(Stacker, self).__init__(layer=layer, dual=dual,
+                                      scheduler=scheduler, copy=copy)
 
     def _format_instance_list(self):
         """Expand the instance lists to every fold with associated indices."""
@@ -31,12 +31,6 @@ class Stacker(BaseEstimator):
 
         return e, t
 
-    def _get_col_id(self):
-        """Assign unique col_id to every estimator."""
-        c = getattr(self.layer, 'classes_', 1)
-        p = len(self.layer.cases)
-        return _get_col_idx(self.e, p, c)
-
 
 ###############################################################################
 def _expand_instance_list(instance_list, indexer):
@@ -85,108 +79,59 @@ def _expand_instance_list(instance_list, indexer):
     >>> _expand_instance_list(instance_list, indexer)
     [list of estimation tuples, beginning with main estimators]
     """
-    splits = indexer.n_splits
-
     if instance_list is None or len(instance_list) == 0:
         # Capture cases when there is no preprocessing to avoid running a
         # parallel job.
         return None
 
-    elif isinstance(instance_list, dict):
+    # Instances are copied for the full data and every fold in one go
+    folds = list(indexer.generate()) if indexer is not None else []
+    splits = indexer.n_splits if indexer is not None else 0
+
+    if isinstance(instance_list, dict):
         # We need to build fit list on a case basis
+        cases = sorted(instance_list)
+        copies = {case: _replicate(instance_list[case], len(folds) + 1)
+                  for case in cases}
 
         # --- Full data ---
         # Estimators to be fitted on full data. List entries have format:
         # (case, no_train_idx, no_test_idx, est_list)
         # Each est_list have entries (inst_name, cloned_est)
-        ls = [('%s' % case, None, None,
-               [(n, clone(e)) for n, e in instance_list[case]])
-              for case in sorted(instance_list)]
+        ls = [('%s' % case, None, None, copies[case][0]) for case in cases]
 
         # --- Folds ---
         # Estimators to be fitted on each fold. List entries have format:
         # (case__fold_num, train_idx, test_idx, est_list)
         # Each est_list have entries (inst_name__fol_num, cloned_est)
-        if indexer is not None:
-            fd = [('%s__f%i' % (case, i % splits),
-                   tri,
-                   tei,
-                   [('%s__f%i' % (n, i % splits), clone(e)) for n, e in
-                    instance_list[case]])
-                  for case in sorted(instance_list)
-                  for i, (tri, tei) in enumerate(indexer.generate())
-                  ]
-            ls.extend(fd)
+        ls.extend([('%s__f%i' % (case, i % splits),
+                    tri,
+                    tei,
+                    [('%s__f%i' % (n, i % splits), e)
+                     for n, e in copies[case][i + 1]])
+                   for case in cases
+                   for i, (tri, tei) in enumerate(folds)
+                   ])
 
     else:
         # No cases to worry about: expand the list of named instance tuples
+        copies = _replicate(instance_list, len(folds) + 1)
 
         # --- Full data ---
         # Estimators to be fitted on full data. List entries have format:
         # (no_case, no_train_idx, no_test_idx, est_list)
         # Each est_list have entries (inst_name, cloned_est)
-        ls = [(None, None, None, [(n, clone(e)) for n, e in instance_list])]
+        ls = [(None, None, None, copies[0])]
 
         # --- Folds ---
         # Estimators to be fitted on each fold. List entries have format:
         # (None, train_idx, test_idx, est_list)
         # Each est_list have entries (inst_name__fol_num, cloned_est)
-        if indexer is not None:
-            ls.extend([(None,
-                        tri,
-                        tei,
-                        [('%s__f%i' % (n, i % splits), clone(e)) for n, e in
-                         instance_list])
-                       for i, (tri, tei) in enumerate(indexer.generate())
-                       ])
+        ls.extend([(None,
+                    tri,
+                    tei,
+                    [('%s__f%i' % (n, i % splits), e)
+                     for n, e in copies[i + 1]])
+                   for i, (tri, tei) in enumerate(folds)
+                   ])
     return ls
-
-
-def _get_col_idx(instance_list, n_main, labels):
-    """Utility for assigning columns ids to each fold-specific estimator.
-
-    Parameters
-    ----------
-    instance_list : list
-        list of instances per case and per cv fold
-
-    n_main : int
-        number of main cases.
-
-    labels : int
-        number of labels to expand col_id with
-
-    """
-    inc = 1 if labels is None else labels
-
-    # Set up estimator column mapping
-    # We select the main estimators by filtering out
-    # fold-specific estimators and assigning each of the main ests a col_id
-    idx, col = dict(), 0
-    for meta_name, _, _, estimator_list in instance_list[:n_main]:
-        for est_name, _ in estimator_list:
-            idx[(meta_name, est_name)] = col
-
-            col += inc
-
-    # Map every fold-specific estimator back onto the just created column
-    # mapping for the final estimators. The fold-specific estimators should
-    # have the same col_id as the main estimators.
-    for meta_name_w_fold, _, _, estimator_list in instance_list[n_main:]:
-
-        # 'meta_name__f0' > 'meta_name'
-        try:
-            # Fails if meta_name is None
-            meta_name = '__'.join(meta_name_w_fold.split('__')[:-1])
-        except AttributeError:
-            meta_name = None
-
-        # Assign a column to estimators in belonging to the case__fold entry
-        for est_name_w_fold, _ in estimator_list:
-
-            # 'est_name__f0' > 'est_name'
-            est_name = '__'.join(est_name_w_fold.split('__')[:-1])
-
-            idx[meta_name_w_fold, est_name_w_fold] = idx[meta_name, est_name]
-
-    return idx
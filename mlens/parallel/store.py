@@ -0,0 +1,211 @@
+"""ML-ENSEMBLE
+
+:author: Sebastian Flennerhag
+:copyright: 2017
+:licence: MIT
+
+On-disk stores for fitted instances.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ..externals.joblib import hash as joblib_hash
+from ..utils import pickle_load, pickle_save
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+# Errors raised when loading a file that is removed or not fully written
+_LOAD_ERRORS = (OSError, IOError, EOFError, pickle.UnpicklingError)
+
+# Arrays of stored instances larger than this are saved as raw .npy files
+STORE_NBYTES = int(1e6)
+
+
+class FoldStore(object):
+
+    """Sequence of fitted instances kept on disk and loaded lazily.
+
+    Each entry is pickled to its own file in ``dir``. Entries are loaded on
+    access, and the ``maxsize`` most recently used entries are kept in
+    memory. Only the directory and the number of entries are pickled with
+    the store, so the store can be shipped with a fitted layer as long as
+    ``dir`` is available where it is unpickled.
+
+    Parameters
+    ----------
+    dir : str
+        directory to store instances in. Created if it does not exist.
+
+    items : list
+        instances to store.
+
+    maxsize : int (default = 10)
+        maximum number of entries to keep in memory. Set to ``0`` to load
+        entries on every access.
+    """
+
+    def __init__(self, dir, items, maxsize=10):
+        if not os.path.exists(dir):
+            os.makedirs(dir)
+
+        self.dir = dir
+        self.maxsize = maxsize
+        self.n = len(items)
+
+        for i, item in enumerate(items):
+            pickle_save(item, self._path(i), STORE_NBYTES)
+
+        self._init_cache()
+
+    def _init_cache(self):
+        """Set up an empty LRU cache."""
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, i):
+        """Path to the cache file of entry i, without extension."""
+        return os.path.join(self.dir, '%i' % i)
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.n))]
+
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError("FoldStore index out of range.")
+
+        with self._lock:
+            if i in self._cache:
+                # Mark as most recently used
+                item = self._cache.pop(i)
+                self._cache[i] = item
+                return item
+
+        item = pickle_load(self._path(i))
+
+        if self.maxsize > 0:
+            with self._lock:
+                self._cache[i] = item
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return item
+
+    def clear(self):
+        """Drop all entries from memory."""
+        with self._lock:
+            self._cache.clear()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_cache']
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_cache()
+
+
+def fingerprint(X, y):
+    """Hash of the data an estimator is fitted on."""
+    return joblib_hash([X, y], coerce_mmap=True)
+
+
+def instance_key(instance):
+    """Hashable description of an unfitted instance: class and parameters.
+
+    Numpy scalars, as drawn from parameter distributions, are converted to
+    Python scalars so that equal parameters give equal keys.
+    """
+    params = instance.get_params(deep=False)
+    params = {k: v.item() if isinstance(v, np.generic) else v
+              for k, v in params.items()}
+    cls = type(instance)
+    return '%s.%s' % (cls.__module__, cls.__name__), params
+
+
+def fit_key(tri, tei, transformers, estimator):
+    """Hash of an estimator, its preprocessing and its fold indices.
+
+    Parameters
+    ----------
+    tri, tei : tuple or None
+        train and test index of the fold.
+
+    transformers : list or None
+        named, unfitted transformers of the preprocessing case.
+
+    estimator : obj
+        unfitted estimator.
+    """
+    return joblib_hash([tri, tei, trans_key(None, transformers),
+                        instance_key(estimator)])
+
+
+def trans_key(tri, transformers):
+    """Hash of a preprocessing pipeline and its training fold indices."""
+    if transformers is not None:
+        transformers = [instance_key(tr) for _, tr in transformers]
+    return joblib_hash([tri, transformers])
+
+
+def cache_path(memory, fingerprint, key):
+    """Path to the entry of a fit cache for data and instance keys."""
+    return os.path.join(memory, joblib_hash([fingerprint, key]))
+
+
+def load_cached(path):
+    """Load an entry of a fit cache, or return ``None`` if there is none.
+
+    Parameters
+    ----------
+    path : str
+        path to the entry, without extension.
+    """
+    if not os.path.exists(path + '.pkl'):
+        return None
+    try:
+        return pickle_load(path)
+    except _LOAD_ERRORS + (AttributeError, ImportError, ValueError):
+        # Entry removed or corrupted, or its arrays or classes do not match:
+        # fit anew
+        return None
+
+
+def save_cached(obj, path):
+    """Save an entry to a fit cache.
+
+    The entry and its arrays are written under temporary names and then
+    renamed (see :func:`mlens.utils.pickle_save`), so that concurrent jobs
+    never read a partially written entry.
+
+    Parameters
+    ----------
+    obj : object
+        object to cache.
+
+    path : str
+        path to the entry, without extension.
+    """
+    try:
+        pickle_save(obj, path, STORE_NBYTES)
+    except OSError:
+        # Entry already written by another process (Windows). Temporary
+        # files are removed by pickle_save
+        if not os.path.exists(path + '.pkl'):
+            raise
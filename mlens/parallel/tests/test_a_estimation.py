@@ -2,8 +2,22 @@
 
 """
 import os
+import pickle
+import shutil
+import tempfile
+import threading
 import numpy as np
-from mlens.parallel.estimation import _load_trans
+from mlens.base import BlendIndex, FoldIndex, SubsetIndex
+from mlens.ensemble.base import LayerContainer
+from mlens.parallel.estimation import (_describe, _load_trans, _replicate,
+                                       _slice_array, _write, SharedInput,
+                                       fit_est, transform_case,
+                                       predict_shared_est)
+from mlens.parallel.store import STORE_NBYTES, load_cached, save_cached
+from mlens.parallel.subset import _expand_instance_list
+from mlens.utils.dummy import (Data, OLS, GramOLS, Scale, ESTIMATORS,
+                               PREPROCESSING, lc_fit, lc_predict)
+from mlens.utils import pickle_save
 from mlens.utils.exceptions import ParallelProcessingError
 import warnings
 
@@ -17,3 +31,233 @@ def test_load_transformer():
                                  _load_trans, f, 'test', (0.1, 0.2), False)
 
     assert len(w) == 1
+
+
+def test_load_transformer_partial():
+    """[Parallel | Estimation] test loading waits on a truncated file."""
+    dir = tempfile.mkdtemp()
+    try:
+        f = os.path.join(dir, 'dummy')
+        with open(f + '.pkl', 'wb') as fh:
+            fh.write(pickle.dumps([('sc', Scale())])[:10])
+
+        timer = threading.Timer(0.2, pickle_save, ([('sc', None)], f))
+        timer.start()
+        assert _load_trans(f, 'test', (0.05, 5), True) == [('sc', None)]
+        timer.join()
+    finally:
+        shutil.rmtree(dir)
+
+
+def test_save_cached():
+    """[Parallel | Estimation] test cache entries are saved with arrays."""
+    dir = tempfile.mkdtemp()
+    try:
+        f = os.path.join(dir, 'entry')
+        obj = (OLS(), np.arange(STORE_NBYTES // 4, dtype=np.float64))
+        save_cached(obj, f)
+        assert sorted(os.listdir(dir)) == ['entry.pkl', 'entry_0.npy']
+        np.testing.assert_array_equal(load_cached(f)[1], obj[1])
+
+        # Failed entries leave no files behind
+        np.testing.assert_raises(Exception, save_cached,
+                                 (obj[1], lambda: None), f + '2')
+        assert sorted(os.listdir(dir)) == ['entry.pkl', 'entry_0.npy']
+    finally:
+        shutil.rmtree(dir)
+
+
+def test_shared_input():
+    """[Parallel | Estimation] test predicting on a shared input."""
+    X = np.arange(24, dtype=np.float).reshape(8, 3)
+    y = X.sum(axis=1)
+    sc = Scale().fit(X)
+    ols = OLS().fit(sc.transform(X), y)
+
+    for cache in [dict(), tempfile.mkdtemp()]:
+        shared = SharedInput(cache, 'x')
+        transform_case(shared, [('sc', sc)], X, ((0, 2), (5, 8)), 'layer')
+
+        P = np.zeros((8, 2))
+        predict_shared_est(shared, 'ols', ols, P, [(0, 2), (5, 8)], 1,
+                           'layer', 'predict')
+
+        idx = [0, 1, 5, 6, 7]
+        np.testing.assert_array_equal(P[idx, 1],
+                                      ols.predict(sc.transform(X[idx])))
+        assert not P[2:5].any()
+
+        if not isinstance(cache, dict):
+            shutil.rmtree(cache)
+
+
+def test_slice_array():
+    """[Parallel | Estimation] test slicing on ranges."""
+    X = np.arange(20).reshape(10, 2)
+    y = np.arange(10)
+
+    for copy in [True, False]:
+        x, z = _slice_array(X, y, (2, 5), copy)
+        np.testing.assert_array_equal(x, X[2:5])
+        np.testing.assert_array_equal(z, y[2:5])
+        assert np.may_share_memory(x, X) is not copy
+        assert x.flags.writeable is copy
+
+        x, z = _slice_array(X, y, ((0, 2), (7, 10)), copy)
+        np.testing.assert_array_equal(x, X[[0, 1, 7, 8, 9]])
+        np.testing.assert_array_equal(z, y[[0, 1, 7, 8, 9]])
+
+
+def test_lc_no_copy():
+    """[Parallel | Estimation] test layer container fit without copying."""
+    data = Data('stack', False, True, 3)
+    X, y = data.get_data((6, 2), 2)
+    (F, wf), (P, wp) = data.ground_truth(X, y)
+
+    lc = LayerContainer().add(
+        estimators=ESTIMATORS, cls='stack', preprocessing=PREPROCESSING,
+        indexer=data.indexer, cls_kwargs={'copy': False})
+
+    lc_fit(lc, X, y, F, wf)
+    lc_predict(lc, X, P, wp)
+
+
+def test_write():
+    """[Parallel | Estimation] test writing predictions on row ranges."""
+    P = np.zeros((6, 3))
+    _write(P, [(0, 1), (4, 6)], 1, np.ones((3, 2)))
+    _write(P, [(1, 4)], 0, np.arange(3))
+
+    np.testing.assert_array_equal(P, [[0, 1, 1],
+                                      [0, 0, 0],
+                                      [1, 0, 0],
+                                      [2, 0, 0],
+                                      [0, 1, 1],
+                                      [0, 1, 1]])
+
+
+def test_fit_est_return():
+    """[Parallel | Estimation] test returning fitted estimators."""
+    X = np.arange(24, dtype=np.float).reshape(8, 3)
+    y = X.sum(axis=1)
+    dir = tempfile.mkdtemp()
+    try:
+        f = os.path.join(dir, 'None__ols__e.pkl')
+        for nbytes in [None, 0, np.inf]:
+            out = fit_est(dir, None, 'ols', OLS(), X, y, None,
+                          (None, None, 0), True, False, 'layer', (0.1, 1),
+                          'predict', return_nbytes=nbytes)
+
+            if nbytes is np.inf:
+                assert not os.path.exists(f)
+                np.testing.assert_array_equal(out[1].coef_,
+                                              OLS().fit(X, y).coef_)
+            else:
+                assert out is None
+                assert os.path.exists(f)
+                os.remove(f)
+    finally:
+        shutil.rmtree(dir)
+
+
+def test_lc_fold_store():
+    """[Parallel | Estimation] test transform with lazily loaded folds."""
+    data = Data('stack', False, True, 3)
+    X, y = data.get_data((6, 2), 2)
+
+    dir = tempfile.mkdtemp()
+    try:
+        lc = LayerContainer().add(
+            estimators=ESTIMATORS, cls='stack', preprocessing=PREPROCESSING,
+            indexer=data.indexer, fold_store=dir, fold_cache=2)
+        ref = LayerContainer().add(
+            estimators=ESTIMATORS, cls='stack', preprocessing=PREPROCESSING,
+            indexer=data.indexer)
+
+        F = lc.fit(X, y, return_preds=-1)[-1]
+        np.testing.assert_array_equal(F, ref.fit(X, y, return_preds=-1)[-1])
+
+        layer = lc.layers['layer-1']
+        assert len(layer.estimators_) == layer.n_pred
+        assert len(layer.fold_estimators_._cache) == 0
+
+        np.testing.assert_array_equal(lc.transform(X), F)
+        assert len(layer.fold_estimators_._cache) == 2
+        np.testing.assert_array_equal(lc.predict(X), ref.predict(X))
+
+        lc = pickle.loads(pickle.dumps(lc))
+        np.testing.assert_array_equal(lc.transform(X), F)
+    finally:
+        shutil.rmtree(dir)
+
+
+def test_fit_folds():
+    """[Parallel | Estimation] test fitting all folds in one task."""
+    X = np.random.RandomState(0).rand(12, 3)
+    y = X.sum(axis=1)
+
+    for cls, indexer in [('stack', FoldIndex(3)),
+                         ('subset', SubsetIndex(2, 2)),
+                         ('blend', BlendIndex(4))]:
+        lc = LayerContainer().add(
+            estimators=[('a', GramOLS()), ('b', GramOLS(offset=1))],
+            cls=cls, indexer=indexer)
+        ref = LayerContainer().add(
+            estimators=[('a', OLS()), ('b', OLS(offset=1))],
+            cls=cls, indexer=indexer)
+
+        F = lc.fit(X, y, return_preds=-1)[-1]
+        np.testing.assert_array_almost_equal(
+            F, ref.fit(X, y, return_preds=-1)[-1])
+        np.testing.assert_array_almost_equal(lc.predict(X), ref.predict(X))
+
+        layer = lc.layers['layer-1']
+        ref_layer = ref.layers['layer-1']
+        assert ([n for n, _ in layer.estimators_] ==
+                [n for n, _ in ref_layer.estimators_])
+
+
+def test_replicate():
+    """[Parallel | Estimation] test replicating instances."""
+    ols = OLS(offset=2)
+    ols.fit(np.ones((4, 1)), np.ones(4))
+
+    copies = _replicate([('sc', Scale()), ('ols', ols)], 3)
+    assert len(copies) == 3
+
+    objs = list()
+    for c in copies:
+        assert [n for n, _ in c] == ['sc', 'ols']
+        assert c[1][1].get_params() == ols.get_params()
+        assert not hasattr(c[1][1], 'coef_')
+        objs.extend([o for _, o in c])
+    assert len(set([id(o) for o in objs])) == 6
+
+
+def test_describe():
+    """[Parallel | Estimation] test task records of an instance list."""
+    X = np.arange(24).reshape(12, 2)
+    e = _expand_instance_list({'a': [('a-%i' % i, OLS()) for i in range(2)],
+                               'b': [('b-0', OLS())]},
+                              SubsetIndex(2, 3, X=X))
+    d = _describe(e, 4, 2, 2)
+
+    # 4 main entries and 3 folds per main entry, with 2 + 1 estimators per
+    # partition of case 'a' and 'b'
+    assert d.shape[0] == 2 * 2 + 2 * 1 + 3 * (2 * 2 + 2 * 1)
+    for r in d:
+        case, tri, tei, est_list = e[r['entry']]
+        main = e[r['main']]
+        assert (r['fold'] < 0) == (tei is None)
+        assert main[0] == ['a__j0', 'a__j1', 'b__j0', 'b__j1'][r['main']]
+        assert main[0] == '%s__j%i' % ('ab'[r['case']], r['partition'])
+        assert est_list[r['est']][0].split('__')[0] == \
+            main[-1][r['est']][0]
+        if r['fold'] >= 0:
+            assert case == '%s__f%i' % (main[0], r['fold'])
+
+    main = d[d['fold'] < 0]
+    assert main['col'].tolist() == [0, 2, 4, 6, 8, 10]
+    for r in d:
+        assert r['col'] == main['col'][(main['main'] == r['main']) &
+                                       (main['est'] == r['est'])][0]
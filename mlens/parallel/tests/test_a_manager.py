@@ -0,0 +1,56 @@
+"""ML-ENSEMBLE
+
+Test loading of inputs into the estimation cache.
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from mlens.parallel.manager import _load, _load_input
+
+
+def test_load_csv():
+    """[Parallel | Manager] test streaming text files into the cache."""
+    dir = tempfile.mkdtemp()
+    try:
+        X = np.arange(21, dtype=np.float).reshape(7, 3)
+        for delimiter in [',', ' ']:
+            f = os.path.join(dir, 'X.csv')
+            np.savetxt(f, X, delimiter=delimiter, header='data')
+            np.testing.assert_array_equal(np.load(_load(f, dir, 'X', 2)), X)
+
+        # Header rows are read as nan
+        np.savetxt(f, X, delimiter=',', header='a,b,c', comments='')
+        x = np.load(_load(f, dir, 'X', 2))
+        assert np.isnan(x[0]).all()
+        np.testing.assert_array_equal(x[1:], X)
+
+        np.savetxt(f, X[:, 0])
+        np.testing.assert_array_equal(np.load(_load(f, dir, 'y', 2)),
+                                      X[:, 0])
+    finally:
+        shutil.rmtree(dir)
+
+
+def test_load_memmap():
+    """[Parallel | Manager] test memmaped inputs are not dumped again."""
+    dir = tempfile.mkdtemp()
+    try:
+        f = os.path.join(dir, 'X.npy')
+        np.save(f, np.arange(6, dtype=np.float).reshape(3, 2))
+
+        for mode in ['r', 'r+']:
+            X = np.load(f, mmap_mode=mode)
+            for arr in [X, np.asarray(X)]:
+                x = _load_input(arr, dir, 'X')
+                assert np.may_share_memory(x, X)
+                assert not x.flags.writeable
+            assert X.flags.writeable == (mode == 'r+')
+
+        x = _load_input(np.array(X), dir, 'X')
+        np.testing.assert_array_equal(x, X)
+        assert os.path.exists(os.path.join(dir, 'X.mmap'))
+    finally:
+        shutil.rmtree(dir)
@@ -0,0 +1,80 @@
+"""ML-ENSEMBLE
+
+Test measuring and tracing tasks.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from mlens.parallel.estimation import _load_trans
+from mlens.parallel.profile import Profile, profiled
+from mlens.utils import pickle_save
+
+
+def test_wait_event():
+    """[Parallel | Profile] test waiting on transformers is recorded."""
+    dir = tempfile.mkdtemp()
+    try:
+        f = os.path.join(dir, 'case__t')
+        timer = threading.Timer(0.2, pickle_save, ([('sc', None)], f))
+        timer.start()
+
+        out, stats = profiled(_load_trans, dict(dir=f, case='case',
+                                                ivals=(0.05, 10),
+                                                raise_on_exception=True))
+        timer.join()
+
+        assert out == [('sc', None)]
+        events = stats[-1]
+        assert len(events) == 1
+        assert events[0][0] == 'wait case'
+        assert 0.1 < events[0][2] <= stats[3]
+    finally:
+        shutil.rmtree(dir)
+
+
+def test_trace():
+    """[Parallel | Profile] test exporting a Chrome trace."""
+    records = Profile()
+    for i, events in enumerate([[], [('wait 0', 1.5, 0.25)]]):
+        records.append({'layer': 'layer-1', 'job': 'fit',
+                        'task': (None, 'ols__f%i' % i), 'func': 'fit_est',
+                        'pid': 10 + i, 'tid': 1, 'start': 1. + i,
+                        'duration': 0.5 + i, 'nbytes': 80, 'rss': None,
+                        'events': events})
+
+    dir = tempfile.mkdtemp()
+    try:
+        f = os.path.join(dir, 'trace.json')
+        records.trace(f)
+        with open(f) as t:
+            trace = json.load(t)
+    finally:
+        shutil.rmtree(dir)
+
+    events = trace['traceEvents']
+    assert [e['ph'] for e in events] == ['M', 'M', 'X', 'X', 'X']
+    assert events[2]['name'] == 'layer-1 None/ols__f0'
+    assert (events[3]['ts'], events[3]['dur']) == (1000000, 1500000)
+    assert (events[4]['ts'], events[4]['dur']) == (500000, 250000)
+    assert events[4]['pid'] == 11
+
+    assert records.table(sort='duration').split('\n')[1].split()[2] == \
+        'None/ols__f1'
+
+
+def test_table():
+    """[Parallel | Profile] test sorting the table on columns with gaps."""
+    records = Profile()
+    for i, rss in enumerate([None, 2048, 1024]):
+        records.append({'layer': 'layer-1', 'job': 'fit',
+                        'task': (None, 'ols__f%i' % i), 'func': 'fit_est',
+                        'pid': 10, 'tid': 1, 'start': 1. + i,
+                        'duration': 0.5, 'nbytes': 80, 'rss': rss,
+                        'events': []})
+
+    rows = records.table(sort='rss').split('\n')[1:]
+    assert [row.split()[2] for row in rows] == \
+        ['None/ols__f1', 'None/ols__f2', 'None/ols__f0']
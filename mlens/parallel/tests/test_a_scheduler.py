@@ -0,0 +1,117 @@
+"""ML-ENSEMBLE
+
+Test dependency-aware scheduling.
+"""
+import numpy as np
+
+from mlens.ensemble.base import LayerContainer
+from mlens.externals.joblib import Parallel
+from mlens.parallel.scheduler import Scheduler
+from mlens.utils.dummy import (Data, ESTIMATORS, PREPROCESSING, lc_fit,
+                               lc_predict)
+from mlens.utils.exceptions import ParallelProcessingError
+
+LEN = 6
+WIDTH = 2
+FOLDS = 3
+MOD = 2
+
+data = Data('stack', False, True, FOLDS)
+X, y = data.get_data((LEN, WIDTH), MOD)
+(F, wf), (P, wp) = data.ground_truth(X, y)
+
+
+def _append(out, val):
+    """Append to a shared list."""
+    out.append(val)
+    return val
+
+
+def _fail():
+    """Raise an error."""
+    raise ValueError("Failed.")
+
+
+def _unpicklable():
+    """Return an object that cannot be sent back from a worker process."""
+    return lambda: None
+
+
+def test_scheduler_order():
+    """[Parallel | Scheduler] test dependencies are respected."""
+    for n_jobs in [1, 2]:
+        out = list()
+        with Parallel(n_jobs=n_jobs, backend='threading') as parallel:
+            s = Scheduler(parallel)
+            s.add('a', _append, {'out': out, 'val': 'a'})
+            s.add('b', _append, {'out': out, 'val': 'b'}, deps=['a'])
+            s.add('c', _append, {'out': out, 'val': 'c'}, deps=['a', 'b'])
+            res = s.run()
+
+        assert out == ['a', 'b', 'c']
+        assert res == {'a': 'a', 'b': 'b', 'c': 'c'}
+
+
+def test_scheduler_raises():
+    """[Parallel | Scheduler] test scheduler raises on bad schedules."""
+    with Parallel(n_jobs=1) as parallel:
+        s = Scheduler(parallel)
+        np.testing.assert_raises(ValueError, s.add, 'a', _fail, {}, ['b'])
+
+        s.add('a', _fail, {})
+        np.testing.assert_raises(ValueError, s.add, 'a', _fail, {})
+        np.testing.assert_raises(ValueError, s.run)
+
+    with Parallel(n_jobs=2, backend='threading') as parallel:
+        s = Scheduler(parallel)
+        s.add('a', _fail, {})
+        np.testing.assert_raises(ValueError, s.run)
+
+        # The worker traceback is kept
+        s = Scheduler(parallel)
+        s.add('a', _fail, {})
+        try:
+            s.run()
+        except ValueError as exc:
+            assert 'in _fail()' in str(exc)
+
+
+def test_scheduler_lost_task():
+    """[Parallel | Scheduler] test a task that cannot return fails the run."""
+    with Parallel(n_jobs=2, backend='multiprocessing') as parallel:
+        s = Scheduler(parallel)
+        s.add('a', _unpicklable, {})
+        s.add('b', pow, {'x': 2, 'y': 2}, deps=['a'])
+        np.testing.assert_raises(ParallelProcessingError, s.run)
+
+
+def test_lc_scheduler():
+    """[Parallel | Scheduler] test layer container fit with scheduler."""
+    for backend in ['threading', 'multiprocessing']:
+        lc = LayerContainer(backend=backend).add(
+            estimators=ESTIMATORS, cls='stack', preprocessing=PREPROCESSING,
+            indexer=data.indexer, cls_kwargs={'scheduler': True})
+
+        lc_fit(lc, X, y, F, wf)
+        lc_predict(lc, X, P, wp)
+
+
+def test_lc_graph():
+    """[Parallel | Scheduler] test layer container fit as a task graph."""
+    for backend in ['threading', 'multiprocessing']:
+        lc = LayerContainer(backend=backend, scheduler=True).add(
+            estimators=ESTIMATORS, cls='stack', preprocessing=PREPROCESSING,
+            indexer=data.indexer)
+        lc.add(estimators=ESTIMATORS, cls='stack',
+               preprocessing=PREPROCESSING, indexer=data.indexer)
+
+        lc_ref = LayerContainer(backend=backend).add(
+            estimators=ESTIMATORS, cls='stack', preprocessing=PREPROCESSING,
+            indexer=data.indexer)
+        lc_ref.add(estimators=ESTIMATORS, cls='stack',
+                   preprocessing=PREPROCESSING, indexer=data.indexer)
+
+        np.testing.assert_array_equal(lc.fit(X, y, return_preds=-1)[-1],
+                                      lc_ref.fit(X, y, return_preds=-1)[-1])
+        np.testing.assert_array_equal(lc.predict(X), lc_ref.predict(X))
+        np.testing.assert_array_equal(lc.transform(X), lc_ref.transform(X))
@@ -2,7 +2,8 @@ import numpy as np
 from mlens.utils.dummy import OLS
 from mlens.base import SubsetIndex
 
-from mlens.parallel.subset import _expand_instance_list, _get_col_idx
+from mlens.parallel.estimation import _col_idx, _describe
+from mlens.parallel.subset import _expand_instance_list
 
 from mlens.ensemble.base import LayerContainer
 
@@ -21,7 +22,7 @@ def ground_truth():
     P = np.zeros((12, 2 * 2))
     F = np.zeros((12, 2 * 2))
 
-    cols = _get_col_idx(e, 2, 1)
+    cols = _col_idx(e, _describe(e, 2))
 
     for name, tri, tei, est_list in e:
         for est_name, est in est_list:
@@ -5,7 +5,8 @@
 :licence: MIT
 """
 
-from .utils import pickle_save, pickle_load, print_time, safe_print, CMLog
+from .utils import (pickle_save, pickle_load, print_time, safe_print, CMLog,
+                    annotate)
 from .formatting import check_instances
 from .validation import check_inputs
 from .checks import (check_is_fitted, check_ensemble_build,
@@ -15,4 +16,5 @@ from .checks import (check_is_fitted, check_ensemble_build,
 __all__ = ['check_inputs', 'check_instances',
            'check_is_fitted', 'check_ensemble_build',
            'assert_correct_format', 'check_initialized',
-           'pickle_save', 'pickle_load', 'print_time', 'safe_print', 'CMLog']
+           'pickle_save', 'pickle_load', 'print_time', 'safe_print', 'CMLog',
+           'annotate']
@@ -195,6 +195,62 @@ class LogisticRegression(OLS):
         return labels
 
 
+class GramOLS(OLS):
+
+    """OLS that fits all folds from one Gram matrix.
+
+    Implements the ``fit_folds`` protocol of the estimation engine: the Gram
+    matrix ``X'X`` and ``X'y`` are computed once on the full data, and the
+    statistics of each training fold are obtained by subtracting the
+    contribution of the rows left out.
+
+    Parameters
+    ----------
+    offset : float (default = 0)
+        scalar value to add to the coefficient vector after fitting.
+    """
+
+    def fit_folds(self, X, y, folds):
+        """Fit one estimator per fold.
+
+        Parameters
+        ----------
+        X, y : array-like
+            full training data.
+
+        folds : list
+            ``(train, test)`` tuples of lists of ``(start, stop)`` row ranges.
+        """
+        X, y = check_X_y(X, y, accept_sparse=False)
+        G = np.dot(X.T, X)
+        b = np.dot(X.T, y)
+
+        fitted = list()
+        for train, _ in folds:
+            G_k, b_k = G.copy(), b.copy()
+            for start, stop in _complement(train, X.shape[0]):
+                G_k -= np.dot(X[start:stop].T, X[start:stop])
+                b_k -= np.dot(X[start:stop].T, y[start:stop])
+
+            est = clone(self)
+            est.coef_ = np.linalg.lstsq(G_k, b_k)[0] + self.offset
+            fitted.append(est)
+        return fitted
+
+
+def _complement(ranges, n):
+    """Row ranges in ``[0, n)`` not covered by ``ranges``."""
+    out = list()
+    i = 0
+    for start, stop in sorted(ranges):
+        if start > i:
+            out.append((i, start))
+        i = max(i, stop)
+    if i < n:
+        out.append((i, n))
+    return out
+
+
 class Scale(BaseEstimator, TransformerMixin):
 
     """Removes the a learnt mean in a column-wise manner in an array.
@@ -8,8 +8,10 @@ author: Sebastian Flennerhag
 from __future__ import division
 
 import os
+import sys
 import sysconfig
 import subprocess
+import numpy as np
 from mlens.utils import utils
 
 from time import sleep
@@ -73,20 +75,24 @@ def test_safe_print_string():
         utils.safe_print('test', flush=True, file="stdout")
 
 
-def test_recorder():
-    """[Utils] _recorder: test subprocess recording function."""
+def test_cm_children():
+    """[Utils] CMLog: test child processes are monitored."""
     if psutil is not None and not __version__.startswith('2.'):
-        l = Logger()
-        pid = os.getpid()
-        with redirect_stdout(l):
-            utils._recorder(pid, 0.2, 0.1)
-
-        entries = ''.join(l.log).split('\n')
-        if entries[-1] == '':
-            entries = entries[:-1]
-
-        assert len(entries) == 2
-        assert len(entries[0].split(',')) == 3
+        cm = utils.CMLog()
+        child = subprocess.Popen([sys.executable, '-c',
+                                  'import time; time.sleep(1)'])
+        try:
+            cm.monitor(0.5, 0.1)
+            sleep(0.6)
+            cm.collect()
+        finally:
+            child.kill()
+            child.wait()
+
+        assert cm.n_procs.max() >= 2
+        assert child.pid in cm.peak_rss
+        assert (cm.rss >= cm.rss_parent).all()
+        assert (cm.rss > cm.rss_parent).any()
 
 
 def test_cm():
@@ -118,6 +124,29 @@ def test_cm():
         assert len(cm.vms) == 2
 
 
+def test_cm_annotate():
+    """[Utils] CMLog: test annotating samples with phases."""
+    if psutil is not None and not __version__.startswith('2.'):
+        cm = utils.CMLog()
+        cm.monitor(ival=0.05)
+        sleep(0.12)
+        utils.annotate('a')
+        sleep(0.12)
+        cm.annotate('b')
+        sleep(0.12)
+        cm.collect()
+
+        # Monitors are only annotated while running
+        utils.annotate('c')
+
+        assert cm.phases == ['a', 'b']
+        assert cm.phase[0] == -1
+        assert cm.phase[-1] == 1
+        assert 0 in cm.phase
+        assert (np.diff(cm.phase) >= 0).all()
+        assert (np.diff(cm.t) > 0).all()
+
+
 def test_cm_exception():
     """[Utils] CMLog: test collecting un-monitored returns None."""
     if psutil is not None and not __version__.startswith('2.'):
@@ -137,3 +166,37 @@ def test_pickle():
     assert isinstance(d, dict)
     assert test['entry1'] == 'test'
     assert test['entry2'] == 'also_test'
+
+
+def test_pickle_arrays():
+    """[Utils] Check that large arrays are pickled as memory-mappable files."""
+    obj = {'small': np.arange(3), 'large': np.arange(100, dtype=np.float64)}
+    utils.pickle_save(obj, 'o', 100)
+    try:
+        assert os.path.exists('o_0.npy')
+        test = utils.pickle_load('o', 'r')
+        assert isinstance(test['large'], np.memmap)
+        assert not isinstance(test['small'], np.memmap)
+        np.testing.assert_array_equal(test['large'], obj['large'])
+        np.testing.assert_array_equal(test['small'], obj['small'])
+    finally:
+        for f in os.listdir('.'):
+            if f.startswith('o.pkl') or f.startswith('o_'):
+                os.remove(f)
+
+
+def test_pickle_atomic():
+    """[Utils] Check that failed pickles leave no files behind."""
+    obj = {'large': np.arange(100, dtype=np.float64), 'fail': lambda: None}
+    np.testing.assert_raises(Exception, utils.pickle_save, obj, 'a', 100)
+    assert not [f for f in os.listdir('.') if f.startswith('a.pkl') or
+                f.startswith('a_')]
+
+    del obj['fail']
+    utils.pickle_save(obj, 'a', 100)
+    try:
+        assert sorted(f for f in os.listdir('.') if f.startswith('a.pkl') or
+                      f.startswith('a_')) == ['a.pkl', 'a_0.npy']
+    finally:
+        os.remove('a.pkl')
+        os.remove('a_0.npy')
@@ -7,22 +7,26 @@
 
 from __future__ import division, print_function, with_statement
 
-from numpy import array
-import subprocess
+import numpy as np
 import sys
 import os
+import threading
 
 try:
     import psutil
 except ImportError:
     psutil = None
 
+try:
+    from threading import get_ident
+except ImportError:
+    from thread import get_ident
+
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
 
-from time import sleep
 try:
     from time import perf_counter as _time
 except ImportError:
@@ -31,16 +35,58 @@ except ImportError:
 
 
 ###############################################################################
-def pickle_save(obj, name):
-    """Utility function for pickling an object"""
-    with open(name + '.pkl', 'wb') as f:
-        pickle.dump(obj, f)
+def pickle_save(obj, name, nbytes=None):
+    """Utility function for pickling an object
 
+    If ``nbytes`` is set, numpy arrays of at least ``nbytes`` bytes are not
+    pickled but saved as raw ``.npy`` files next to the pickle. These are
+    fast to read and can be memory-mapped by :func:`pickle_load`.
 
-def pickle_load(name):
-    """Utility function for loading pickled object"""
+    All files are written under temporary names and renamed into place once
+    complete, the pickle last, so that a reader never finds a partially
+    written pickle or a pickle without its arrays.
+    """
+    tmp = '.%i.%i' % (os.getpid(), get_ident())
+    files = [(name + '.pkl' + tmp, name + '.pkl')]
+    try:
+        with open(files[0][0], 'wb') as f:
+            if nbytes is None:
+                pickle.dump(obj, f)
+            else:
+                def persistent_id(x):
+                    if (type(x) in (np.ndarray, np.memmap) and
+                            not x.dtype.hasobject and x.nbytes >= nbytes):
+                        f_arr = '%s_%i.npy' % (name, len(files) - 1)
+                        files.append((f_arr + tmp, f_arr))
+                        with open(f_arr + tmp, 'wb') as f_tmp:
+                            np.save(f_tmp, x)
+                        return os.path.basename(f_arr)
+                    return None
+
+                pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+                pickler.persistent_id = persistent_id
+                pickler.dump(obj)
+
+        for src, dst in files[1:] + files[:1]:
+            os.rename(src, dst)
+    except BaseException:
+        for src, _ in files:
+            if os.path.exists(src):
+                os.remove(src)
+        raise
+
+
+def pickle_load(name, mmap_mode=None):
+    """Utility function for loading pickled object
+
+    Arrays stored as ``.npy`` files by :func:`pickle_save` are loaded with
+    ``mmap_mode`` (see :func:`numpy.load`).
+    """
     with open(name + '.pkl', 'rb') as f:
-        return pickle.load(f)
+        unpickler = pickle.Unpickler(f)
+        unpickler.persistent_load = lambda pid: np.load(
+            os.path.join(os.path.dirname(name), pid), mmap_mode=mmap_mode)
+        return unpickler.load()
 
 
 ###############################################################################
@@ -78,11 +124,20 @@ class CMLog(object):
     """CPU and Memory logger.
 
     Class for starting a monitor job of CPU and memory utilization in the
-    background in a Python script. The ``monitor`` class records the
-    ``cpu_percent``, ``rss`` and ``vms`` as collected by the
-    psutil_ library for the parent process' pid.
+    background in a Python script. The monitor samples the ``cpu_percent``,
+    ``rss`` and ``vms`` of the parent process and all its child processes,
+    such as the workers of a parallel job, as collected by the psutil_
+    library. Samples are taken on a background thread and written to
+    preallocated arrays.
 
-    CPU usage and memory utilization are stored as attributes in numpy arrays.
+    CPU usage and memory utilization are stored as attributes in numpy arrays,
+    summed over the process tree. Hence, CPU usage can exceed 100 when
+    several processes are active.
+
+    Samples can be annotated with the phase of the job being monitored
+    through :meth:`annotate`, or for all running monitors through the
+    module-level :func:`annotate`, which ensembles call as layers are
+    fitted and predicted with.
 
     .. _psutil: https://pypi.python.org/pypi/psutil
 
@@ -92,20 +147,17 @@ class CMLog(object):
     >>> from mlens.utils.utils import CMLog
     >>> cm = CMLog(verbose=True)
     >>> cm.monitor(2, 0.5)
+    >>> cm.annotate('list')
     >>> _ = [i for i in range(10000000)]
     >>>
-    >>> # Collecting before completion triggers a message but no error
-    >>> cm._collect()
-    >>>
     >>> sleep(2)
-    >>> cm._collect()
+    >>> cm.collect()
     >>> print('CPU usage:')
     >>> cm.cpu
     [CMLog] Monitoring for 2 seconds with checks every 0.5 seconds.
-    [CMLog] Job not finished. Cannot _collect yet.
-    [CMLog] Collecting... done. Read 4 lines in 0.000 seconds.
+    [CMLog] Collecting... done. Read 4 samples in 0.000 seconds.
     CPU usage:
-    array([ 50. ,  22.4,   6. ,  11.9])
+    array([  0. ,  98.3,  22.4,   6. ])
 
     Raises
     ------
@@ -117,6 +169,30 @@ class CMLog(object):
     ----------
     verbose : bool
         whether to notify of job start.
+
+    Attributes
+    ----------
+    cpu, rss, vms : array
+        CPU utilization and resident and virtual memory of the process tree
+        in each sample.
+
+    rss_parent : array
+        resident memory of the parent process in each sample.
+
+    n_procs : array
+        number of processes in the tree in each sample.
+
+    t : array
+        time of each sample, in seconds since monitoring started.
+
+    phase : array
+        index in ``phases`` of the phase of each sample, or ``-1`` if none.
+
+    phases : list
+        names of annotated phases.
+
+    peak_rss : dict
+        peak resident memory of each process sampled, by process id.
     """
 
     def __init__(self, verbose=False):
@@ -134,15 +210,15 @@ class CMLog(object):
         Parameters
         ----------
         stop : float or None (default = None)
-            seconds to monitor for. If None, monitors until ``_collect`` is
+            seconds to monitor for. If None, monitors until ``collect`` is
             called.
 
         ival : float (default=0.1)
             interval of monitoring.
 
         kill : bool (default = True)
-            whether to kill the monitoring job if ``_collect`` is called before
-            timeout (``stop``). If set to False, calling ``_collect`` will
+            whether to kill the monitoring job if ``collect`` is called before
+            timeout (``stop``). If set to False, calling ``collect`` will
             cause the instance to wait until the job completes.
         """
         if stop is None and not kill:
@@ -153,12 +229,12 @@ class CMLog(object):
         self._kill = kill
 
         # Delete previous job data to avoid confusion
-        try:
-            del self.cpu
-            del self.rss
-            del self.vms
-        except AttributeError:
-            pass
+        for attr in ['cpu', 'rss', 'vms', 'rss_parent', 'n_procs', 't',
+                     'phase', 'phases', 'peak_rss']:
+            try:
+                delattr(self, attr)
+            except AttributeError:
+                pass
 
         if self.verbose:
             if self._stop is not None:
@@ -168,101 +244,163 @@ class CMLog(object):
                 safe_print("[CMLog] Monitoring until collection with checks "
                            "every {} seconds.".format(ival))
 
-        # Initialize subprocess
-        self._out = \
-            subprocess.Popen([sys.executable, '-c',
-                              'from mlens.utils.utils import _recorder; '
-                              '_recorder({}, {}, {})'.format(self.pid,
-                                                             stop,
-                                                             float(ival))],
-                             stdout=subprocess.PIPE)
-        return
+        # Preallocate for the full job if it is timed, else grow as needed
+        size = int(stop / ival) + 1 if stop is not None else 1024
+        self._samples = {'t': np.zeros(size),
+                         'cpu': np.zeros(size),
+                         'rss': np.zeros(size, dtype=np.int64),
+                         'vms': np.zeros(size, dtype=np.int64),
+                         'rss_parent': np.zeros(size, dtype=np.int64),
+                         'n_procs': np.zeros(size, dtype=np.int32),
+                         'phase': np.zeros(size, dtype=np.int32)}
+        self._n = 0
+        self._phases = list()
+        self._phase = -1
+        self._peak_rss = dict()
+        self._procs = dict()
+        self._process = psutil.Process(self.pid)
+
+        self._halt = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(stop, ival))
+        self._thread.daemon = True
+
+        with _MONITORS_LOCK:
+            _MONITORS.append(self)
+        self._thread.start()
+
+    def annotate(self, phase):
+        """Set the phase of subsequent samples.
+
+        Parameters
+        ----------
+        phase : str or None
+            name of the phase. If ``None``, subsequent samples have no phase.
+        """
+        if phase is None:
+            self._phase = -1
+            return
+
+        if phase not in self._phases:
+            self._phases.append(phase)
+        self._phase = self._phases.index(phase)
 
     def collect(self):
         """Collect monitored data.
 
-        Once a monitor job finishes, call ``_collect`` to read the CPU and
-        memory usage into python objects in the current process. If called
-        before the job finishes, _collect issues a print statement to try
-        again later, but no warning or error is raised.
+        Once a monitor job finishes, call ``collect`` to store the CPU and
+        memory usage as attributes. If the job is timed and ``kill=False``,
+        waits until the job completes.
         """
         if not hasattr(self, '_stop'):
-            safe_print('No monitoring job initiated: nothing to _collect.')
+            safe_print('No monitoring job initiated: nothing to collect.')
             return
 
-        if self._stop is None:
-            # If no timer, kill process.
-            self._out.kill()
-
-            if self.verbose:
-                safe_print("[CMLog] Collecting...", end=" ",  flush=True)
-
-        # Check if job is not completed and if so, check whether to kill
-        elif _time() - self._t0 < self._stop:
-            if self._kill:
-                if self.verbose:
-                    safe_print("[CMLog] Job not finished - killing process "
-                               "and collecting...", end=" ", flush=True)
-                self._out.kill()
-
+        if self._stop is None or self._kill:
+            if (self.verbose and self._stop is not None and
+                    _time() - self._t0 < self._stop):
+                safe_print("[CMLog] Job not finished - killing process "
+                           "and collecting...", end=" ", flush=True)
             elif self.verbose:
-                # Wait until completion (this is done in the 'communicate'
-                # command
-                safe_print("[CMLog] Job not finished - waiting "
-                           "until completion and collecting...",
-                           end=" ",  flush=True)
+                safe_print("[CMLog] Collecting...", end=" ", flush=True)
+            self._halt.set()
 
-        # If job done, we just need to _collect
         elif self.verbose:
-            safe_print("[CMLog] Collecting...", end=" ",  flush=True)
-
-        t0, i = _time(), 0
-        cpu, rss, vms = [], [], []
-
-        out = self._out.communicate()
-        out = out[0].decode().strip().split('\n')
-        for line in out:
+            if _time() - self._t0 < self._stop:
+                safe_print("[CMLog] Job not finished - waiting "
+                           "until completion and collecting...",
+                           end=" ", flush=True)
+            else:
+                safe_print("[CMLog] Collecting...", end=" ", flush=True)
 
-            c, r, v = line.split(',')
+        t0 = _time()
+        self._thread.join()
 
-            cpu.append(float(c.strip()))
-            rss.append(int(r.strip()))
-            vms.append(int(v.strip()))
+        with _MONITORS_LOCK:
+            _MONITORS.remove(self)
 
-            i += 1
+        for key, arr in self._samples.items():
+            setattr(self, key, arr[:self._n].copy())
+        self.phases = self._phases
+        self.peak_rss = self._peak_rss
 
         if self.verbose:
-            safe_print('done. Read {} lines in '
-                       '{:.3f} seconds.'.format(i, _time() - t0))
-
-        self.cpu = array(cpu)
-        self.vms = array(vms)
-        self.rss = array(rss)
+            safe_print('done. Read {} samples in '
+                       '{:.3f} seconds.'.format(self._n, _time() - t0))
 
         # Clear job data
-        del self._t0
-        del self._stop
-        del self._kill
-
-        self._out.terminate()
-        del self._out
-
-
-def _recorder(pid, stop, ival):
-    """Subprocess call function to record cpu and memory."""
-    t = t0 = _time()
-
-    process = psutil.Process(pid)
-
-    if stop is None:
-        while True:
-            m = process.memory_info()
-            print(psutil.cpu_percent(), ',', m[0], ',', m[1])
-            sleep(ival)
-            t = _time()
-    else:
-        while t - t0 < stop:
-            m = process.memory_info()
-            print(psutil.cpu_percent(), ',', m[0], ',', m[1])
-            sleep(ival)
-            t = _time()
+        for attr in ['_t0', '_stop', '_kill', '_samples', '_n', '_phases',
+                     '_phase', '_peak_rss', '_procs', '_process', '_halt',
+                     '_thread']:
+            delattr(self, attr)
+
+    def _run(self, stop, ival):
+        """Sample the process tree until halted or timed out."""
+        while not self._halt.is_set():
+            t = _time() - self._t0
+            if stop is not None and t >= stop:
+                break
+            self._sample(t)
+            self._halt.wait(ival)
+
+    def _sample(self, t):
+        """Record one sample of the process tree."""
+        try:
+            procs = [self._process] + self._process.children(recursive=True)
+        except psutil.Error:
+            procs = [self._process]
+
+        cpu, rss, vms, rss_parent, n_procs = 0., 0, 0, 0, 0
+        for proc in procs:
+            # Reuse process handles: cpu_percent is measured since the
+            # previous call on the same handle
+            proc = self._procs.setdefault(proc.pid, proc)
+            try:
+                c = proc.cpu_percent()
+                m = proc.memory_info()
+            except psutil.Error:
+                # Process exited since listed
+                continue
+
+            cpu += c
+            rss += m[0]
+            vms += m[1]
+            n_procs += 1
+            if proc.pid == self.pid:
+                rss_parent = m[0]
+            self._peak_rss[proc.pid] = max(self._peak_rss.get(proc.pid, 0),
+                                           m[0])
+
+        samples = self._samples
+        if self._n == samples['t'].shape[0]:
+            for key, arr in samples.items():
+                samples[key] = np.concatenate([arr, np.zeros_like(arr)])
+
+        i = self._n
+        samples['t'][i] = t
+        samples['cpu'][i] = cpu
+        samples['rss'][i] = rss
+        samples['vms'][i] = vms
+        samples['rss_parent'][i] = rss_parent
+        samples['n_procs'][i] = n_procs
+        samples['phase'][i] = self._phase
+        self._n += 1
+
+
+# Monitors currently running, to annotate with the phase of a job
+_MONITORS = list()
+_MONITORS_LOCK = threading.Lock()
+
+
+def annotate(phase):
+    """Set the phase of subsequent samples of all running :class:`CMLog`.
+
+    Parameters
+    ----------
+    phase : str or None
+        name of the phase. If ``None``, subsequent samples have no phase.
+    """
+    if not _MONITORS:
+        return
+    with _MONITORS_LOCK:
+        for cm in _MONITORS:
+            cm.annotate(phase)